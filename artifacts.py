@@ -0,0 +1,139 @@
+import asyncio
+import json
+import multiprocessing
+from concurrent.futures import Future, ProcessPoolExecutor
+from enum import Enum
+from pathlib import Path
+from types import SimpleNamespace
+
+from browser_use import Agent
+from browser_use.agent.gif import create_history_gif
+
+
+class ArtifactMode(Enum):
+    OFF = "off"
+    FRAME_LOG = "frame_log"  # one JSON line per step: url, goal, actions, errors
+    GIF = "gif"  # animated GIF of the screenshots, encoded in a background process
+
+
+def _encode_gif(task: str, frames: list[tuple[str, str | None]], output_path: str):
+    # Runs in a worker process. create_history_gif only reads the screenshot and
+    # next goal of every step, so a stand-in for the history is enough and the
+    # agent's dynamically created action models never need pickling.
+    history = SimpleNamespace(
+        history=[
+            SimpleNamespace(
+                state=SimpleNamespace(screenshot=screenshot),
+                model_output=(
+                    SimpleNamespace(current_state=SimpleNamespace(next_goal=goal))
+                    if goal is not None
+                    else None
+                ),
+            )
+            for screenshot, goal in frames
+        ]
+    )
+    create_history_gif(task=task, history=history, output_path=output_path)
+
+
+class ArtifactWriter:
+    """
+    Writes the artifact of every agent once it has finished. GIFs are handed to a
+    process pool, so encoding neither blocks the event loop nor counts against the
+    timeout of the next stage; close waits for the ones still being encoded.
+    """
+
+    def __init__(self, mode: ArtifactMode = ArtifactMode.GIF, max_workers: int = 2):
+        self.mode = mode
+        self.max_workers = max_workers
+        self._executor: ProcessPoolExecutor | None = None
+        self._pending: list[Future] = []
+
+    def write(self, agent: Agent, path_stem: str):
+        """
+        Record the history of a finished agent to path_stem plus the extension of
+        the mode.
+        """
+        history = agent.state.history.history
+        if self.mode == ArtifactMode.OFF or not history:
+            return
+
+        if self.mode == ArtifactMode.FRAME_LOG:
+            with Path(f"{path_stem}.jsonl").open("w") as log_file:
+                for step, item in enumerate(history, 1):
+                    frame = {
+                        "step": step,
+                        "url": item.state.url,
+                        "goal": (
+                            item.model_output.current_state.next_goal
+                            if item.model_output
+                            else None
+                        ),
+                        "actions": (
+                            [
+                                action.model_dump(exclude_none=True)
+                                for action in item.model_output.action
+                            ]
+                            if item.model_output
+                            else []
+                        ),
+                        "elements": [
+                            element.xpath if element else None
+                            for element in item.state.interacted_element
+                        ],
+                        "errors": [
+                            result.error for result in item.result if result.error
+                        ],
+                    }
+                    log_file.write(json.dumps(frame) + "\n")
+            return
+
+        if self._executor is None:
+            # Spawned rather than forked, the parent runs Playwright's threads
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        frames = [
+            (
+                item.state.screenshot,
+                (
+                    item.model_output.current_state.next_goal
+                    if item.model_output
+                    else None
+                ),
+            )
+            for item in history
+            # Compacted steps (see memory.compact_history) have no screenshot left,
+            # and create_history_gif gives up if the first step has none
+            if item.state.screenshot
+        ]
+        if not frames:
+            return
+        self._forget_finished()
+        self._pending.append(
+            self._executor.submit(_encode_gif, agent.task, frames, f"{path_stem}.gif")
+        )
+
+    def _forget_finished(self):
+        # A writer shared by a long-lived worker must not collect every future
+        pending = []
+        for future in self._pending:
+            if not future.done():
+                pending.append(future)
+            elif future.exception() is not None:
+                print(f"Failed to encode a GIF: {future.exception()}")
+        self._pending = pending
+
+    async def close(self):
+        pending, self._pending = self._pending, []
+        results = await asyncio.gather(
+            *(asyncio.wrap_future(future) for future in pending),
+            return_exceptions=True,
+        )
+        for result in results:
+            if isinstance(result, Exception):
+                print(f"Failed to encode a GIF: {result}")
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
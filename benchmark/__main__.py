@@ -0,0 +1,302 @@
+import argparse
+import asyncio
+import copy
+import json
+import random
+import re
+import tempfile
+import time
+from pathlib import Path
+
+from pydantic import BaseModel
+
+from artifacts import ArtifactMode, ArtifactWriter
+from benchmark.model import ScriptedChatModel
+from benchmark.server import FormServer
+from data import MOCK_DATA
+from decompose import get_form_fields
+from direct import as_checked
+from llm_cache import DiskLLMCache
+from main import PromptType, fill_form
+from memory import PeakRSS
+from tracing import LLM_TIMING_CALLBACK, Tracer
+
+FAMILY_NAMES = ["Doe", "Nguyen", "Okafor", "García", "O'Brien", "Kowalski"]
+GIVEN_NAMES = ["John", "Mei", "Chidi", "Lucía", "Siobhan", "Piotr"]
+CITIES = [("Boston", "MA"), ("Austin", "TX"), ("Denver", "CO"), ("Seattle", "WA")]
+STATE_NAMES = {
+    "MA": "Massachusetts",
+    "TX": "Texas",
+    "CO": "Colorado",
+    "WA": "Washington",
+}
+UNIT_TYPES = ["Apt", "Ste", "Flr", ""]
+CLIENT_TYPES = ["Applicant", "Petitioner", "Requestor", "Beneficiary", "Respondent"]
+
+
+class BenchmarkResult(BaseModel):
+    prompt_type: str
+    record: int
+    success: bool
+    duration_seconds: float
+    llm_calls: int
+    input_tokens: int
+    output_tokens: int
+    steps: int
+    fields: int
+    correct: int
+    wrong: list[str]
+    peak_rss_mb: float = 0.0  # of this process during the run, not the browser
+    rss_growth_mb: float = 0.0  # still resident after the run
+
+
+def make_variant(seed: int) -> dict:
+    """
+    A copy of MOCK_DATA with names, addresses, options and checkboxes changed, and
+    one or two Part 6 entries.
+    """
+    rng = random.Random(seed)
+    record = copy.deepcopy(MOCK_DATA)
+    for section in ("attorney", "client"):
+        city, state = rng.choice(CITIES)
+        record[section].update(
+            family_name=rng.choice(FAMILY_NAMES),
+            first_name=rng.choice(GIVEN_NAMES),
+            city=city,
+            # Both spellings occur in real records
+            state=rng.choice([state, STATE_NAMES[state]]),
+            zip_code=f"{rng.randrange(100000):05d}",
+            unit_type=rng.choice(UNIT_TYPES),
+        )
+        record[section]["address_line_2"] = (
+            str(rng.randrange(1, 999)) if record[section]["unit_type"] else ""
+        )
+    record["attorney"]["client_type"] = rng.choice(CLIENT_TYPES)
+    record["attorney"]["administrative_case"] = rng.random() < 0.5
+    record["attorney"]["civil_case"] = not record["attorney"]["administrative_case"]
+    record["attorney"]["civil_matter"] = (
+        "Appeal of denied petition" if record["attorney"]["civil_case"] else ""
+    )
+    record["client"]["send_documents_to_client"] = rng.choice(["Y", "N"])
+    entries = record["part6"]["additional_info"]["entries"]
+    if rng.random() < 0.5:
+        entries.append(
+            {
+                "page_number": "3",
+                "part_number": "3",
+                "item_number": "5",
+                "additional_info": "Client is the derivative beneficiary of the petition",
+            }
+        )
+    return record
+
+
+def _comparable(value) -> str:
+    return re.sub(r"[^a-z0-9]", "", str(value).lower())
+
+
+def _is_correct(value, actual) -> bool:
+    if isinstance(actual, bool):
+        # A single checkbox
+        return actual == bool(as_checked(value))
+    if isinstance(actual, list):
+        # A dropdown reports [option value, option text]
+        return _comparable(value) in map(_comparable, actual)
+    # Text, or the option checked in a checkbox group
+    return actual == ("" if value is None else str(value))
+
+
+def score_fields(form_data: dict, state: dict) -> tuple[int, list[str]]:
+    """
+    Compare the leaves of a record with the form state the page reported last.
+    Leaves without a control on the replica are not scored.
+    """
+    correct = 0
+    wrong = []
+    for path, value in get_form_fields(form_data):
+        key = ".".join(path)
+        if key not in state:
+            continue
+        if _is_correct(value, state[key]):
+            correct += 1
+        else:
+            wrong.append(key)
+    return correct, wrong
+
+
+async def run_benchmark(
+    records: list[dict],
+    prompt_types: list[PromptType],
+    timeout: float,
+    latency: float,
+    use_vision: bool,
+    headless: bool,
+    artifact_dir: Path,
+    artifact_mode: ArtifactMode,
+    trace_path: str | None,
+    llm_cache: DiskLLMCache | None = None,
+    bounded_memory: bool = False,
+) -> list[BenchmarkResult]:
+    results = []
+    artifact_dir.mkdir(parents=True, exist_ok=True)
+    artifacts = ArtifactWriter(artifact_mode)
+    with FormServer() as server:
+        for prompt_type in prompt_types:
+            for index, record in enumerate(records):
+                run = f"{prompt_type.value}-{index}"
+                tracer = Tracer(trace_path)
+                model = ScriptedChatModel(
+                    form_data=record,
+                    latency=latency,
+                    callbacks=[LLM_TIMING_CALLBACK],
+                    cache=llm_cache,
+                )
+                start = time.perf_counter()
+                async with PeakRSS() as rss:
+                    try:
+                        success = await fill_form(
+                            server.url(run),
+                            record,
+                            timeout,
+                            headless=headless,
+                            use_vision=use_vision,
+                            prompt_type=prompt_type,
+                            artifact_prefix=str(artifact_dir / run),
+                            artifacts=artifacts,
+                            tracer=tracer,
+                            model=model,
+                            bounded_memory=bounded_memory,
+                        )
+                    except Exception as e:
+                        print(f"Run {run} failed: {type(e).__name__}: {e}")
+                        success = False
+                duration = time.perf_counter() - start
+
+                run_span = next(span for span in tracer.spans if span.kind == "run")
+                correct, wrong = score_fields(record, server.state(run))
+                results.append(
+                    BenchmarkResult(
+                        prompt_type=prompt_type.value,
+                        record=index,
+                        success=success,
+                        duration_seconds=duration,
+                        llm_calls=run_span.llm_calls,
+                        input_tokens=run_span.input_tokens,
+                        output_tokens=run_span.output_tokens,
+                        steps=sum(1 for span in tracer.spans if span.kind == "step"),
+                        fields=correct + len(wrong),
+                        correct=correct,
+                        wrong=wrong,
+                        peak_rss_mb=rss.peak / 2**20,
+                        rss_growth_mb=(rss.end - rss.start) / 2**20,
+                    )
+                )
+    await artifacts.close()
+    return results
+
+
+def format_results(results: list[BenchmarkResult]) -> str:
+    """
+    One row per run, followed by the totals of every prompt type.
+    """
+    header = (
+        f"{'mode':<12} {'record':>6} {'wall':>8} {'calls':>6} {'tok in':>9} "
+        f"{'tok out':>8} {'steps':>6} {'accuracy':>9} {'peak MB':>8} {'+MB':>6} ok"
+    )
+    lines = [header, "-" * len(header)]
+
+    def row(mode, record, group):
+        fields = sum(r.fields for r in group)
+        accuracy = sum(r.correct for r in group) / fields if fields else 0.0
+        ok = sum(r.success for r in group)
+        return (
+            f"{mode:<12} {record:>6} {sum(r.duration_seconds for r in group):>8.2f} "
+            f"{sum(r.llm_calls for r in group):>6} "
+            f"{sum(r.input_tokens for r in group):>9} "
+            f"{sum(r.output_tokens for r in group):>8} "
+            f"{sum(r.steps for r in group):>6} {accuracy:>9.1%} "
+            f"{max(r.peak_rss_mb for r in group):>8.1f} "
+            f"{sum(r.rss_growth_mb for r in group):>6.1f} {ok}/{len(group)}"
+        )
+
+    for result in results:
+        lines.append(row(result.prompt_type, result.record, [result]))
+    lines.append("-" * len(header))
+    for mode in dict.fromkeys(r.prompt_type for r in results):
+        lines.append(row(mode, "all", [r for r in results if r.prompt_type == mode]))
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        prog="python -m benchmark",
+        description="Fill a local A-28 replica with a scripted model in every mode.",
+    )
+    parser.add_argument(
+        "--modes",
+        nargs="+",
+        choices=[prompt_type.value for prompt_type in PromptType],
+        default=[prompt_type.value for prompt_type in PromptType],
+    )
+    parser.add_argument(
+        "--variants", type=int, default=2, help="generated records besides MOCK_DATA"
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--latency", type=float, default=0.0, help="simulated seconds per LLM call"
+    )
+    parser.add_argument("--timeout", type=float, default=600)
+    parser.add_argument("--vision", action="store_true")
+    parser.add_argument("--headed", action="store_true")
+    parser.add_argument(
+        "--artifacts", help="directory for GIFs, a temporary one if unset"
+    )
+    parser.add_argument(
+        "--artifact-mode",
+        choices=[mode.value for mode in ArtifactMode],
+        default=ArtifactMode.GIF.value,
+    )
+    parser.add_argument("--trace", help="append every span to this JSONL file")
+    parser.add_argument(
+        "--llm-cache", help="cache model responses in this directory across runs"
+    )
+    parser.add_argument(
+        "--bounded-memory",
+        action="store_true",
+        help="compact agent histories step by step, see the peak MB column",
+    )
+    parser.add_argument("--output", help="write the results as JSON to this file")
+    args = parser.parse_args()
+
+    records = [MOCK_DATA] + [make_variant(args.seed + i) for i in range(args.variants)]
+    with tempfile.TemporaryDirectory() as temporary_dir:
+        results = asyncio.run(
+            run_benchmark(
+                records,
+                [PromptType(mode) for mode in args.modes],
+                timeout=args.timeout,
+                latency=args.latency,
+                use_vision=args.vision,
+                headless=not args.headed,
+                artifact_dir=Path(args.artifacts or temporary_dir),
+                artifact_mode=ArtifactMode(args.artifact_mode),
+                trace_path=args.trace,
+                llm_cache=DiskLLMCache(args.llm_cache) if args.llm_cache else None,
+                bounded_memory=args.bounded_memory,
+            )
+        )
+    print(format_results(results))
+    for result in results:
+        if result.wrong:
+            print(
+                f"{result.prompt_type} record {result.record} wrong: "
+                f"{', '.join(result.wrong)}"
+            )
+    if args.output:
+        Path(args.output).write_text(
+            json.dumps([result.model_dump() for result in results], indent=1)
+        )
+
+
+if __name__ == "__main__":
+    main()
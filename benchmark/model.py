@@ -0,0 +1,315 @@
+import asyncio
+import json
+import re
+import uuid
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage, SystemMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+
+from decompose import format_instruction, get_form_fields
+from direct import as_checked, match_score, select_option_value
+
+# "[12]<input checkbox;attorney-unit-type;ste>Ste./>", see
+# DOMElementNode.clickable_elements_to_string in browser_use
+_ELEMENT_LINE = re.compile(r"^\[(\d+)\]<(\w+) ?(.*)/>$")
+_OPTION_LINE = re.compile(r'^\d+: text=(".*")$')
+_MAX_ACTIONS = re.compile(r"Use maximum (\d+) actions per sequence")
+# Greedy, tasks end in a quoted field name so there can be four quotes in a row
+_TASK = re.compile(r'Your (?:new )?ultimate task is: """(.*)"""\.', re.DOTALL)
+
+# Tokens billed for a screenshot, roughly what the providers charge for a
+# 1280x1100 image
+_IMAGE_TOKENS = 1100
+
+
+def _text(message: BaseMessage) -> str:
+    if isinstance(message.content, str):
+        return message.content
+    return "\n".join(
+        part.get("text", "") for part in message.content if isinstance(part, dict)
+    )
+
+
+def _images(message: BaseMessage) -> int:
+    if isinstance(message.content, str):
+        return 0
+    return sum(
+        1
+        for part in message.content
+        if isinstance(part, dict) and part.get("type") == "image_url"
+    )
+
+
+def _parse_elements(state: str) -> list[dict]:
+    """
+    The interactive elements of a state message, each with the line of plain text
+    where its label ends up.
+    """
+    elements = []
+    previous_text = ""
+    for line in state.splitlines():
+        match = _ELEMENT_LINE.match(line.strip())
+        if not match:
+            previous_text = line.strip()
+            if elements and elements[-1]["checkable"] and not elements[-1]["label"]:
+                elements[-1]["label"] = previous_text
+            continue
+        index, tag, rest = match.groups()
+        attributes, _, text = rest.partition(">")
+        tokens = [token for token in attributes.split(";") if token]
+        checkable = "checkbox" in tokens or "radio" in tokens
+        elements.append(
+            {
+                "index": int(index),
+                "tag": tag,
+                "tokens": tokens,
+                "checkable": checkable,
+                # Checkbox labels follow the box
+                "label": "" if checkable else previous_text,
+            }
+        )
+        previous_text = ""
+    return elements
+
+
+def _words(text) -> list[str]:
+    return re.findall(r"[a-z0-9]+", str(text).lower())
+
+
+def _contains_words(text, phrase) -> bool:
+    words = _words(text)
+    phrase = _words(phrase)
+    return bool(phrase) and any(
+        words[i : i + len(phrase)] == phrase
+        for i in range(len(words) - len(phrase) + 1)
+    )
+
+
+def _element_score(path: tuple[str, ...], element: dict) -> int:
+    # Attribute values come without their names, try each one as the name
+    score = max(
+        (
+            match_score(path, {"id": "", "name": token, "label": ""})
+            for token in element["tokens"]
+        ),
+        default=0,
+    )
+    if score:
+        return score
+    # Otherwise read the label, "2.b. Given Name (First Name)" holds first_name
+    return int(_contains_words(element["label"], path[-1]))
+
+
+class ScriptedChatModel(BaseChatModel):
+    """
+    A stand-in for ChatOpenAI/ChatAnthropic that drives the browser_use agent
+    through the A-28 replica without network access. It fills the leaves of
+    form_data whose instructions appear in the agent's task (all of them for
+    tasks made of raw JSON or the overfit prompt), finding controls by name the
+    way DIRECT does, and keeps its progress in the agent's memory field so every
+    call is answered from the messages alone. Token usage is estimated from the
+    message sizes so runs can be compared by cost.
+    """
+
+    form_data: dict
+    latency: float = 0.0  # seconds to sleep per call, to stand in for the API
+
+    @property
+    def _llm_type(self) -> str:
+        return "scripted"
+
+    def bind_tools(self, tools, **kwargs):
+        # The tool call is always named after the AgentOutput schema, there is
+        # nothing to bind
+        return self.bind(**kwargs)
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        return ChatResult(generations=[ChatGeneration(message=self._respond(messages))])
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs):
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        return ChatResult(generations=[ChatGeneration(message=self._respond(messages))])
+
+    def _scope(self, task: str) -> list[tuple[tuple[str, ...], object]]:
+        fields = get_form_fields(self.form_data)
+        scoped = [
+            (path, value)
+            for path, value in fields
+            if format_instruction(path, value) in task
+        ]
+        return scoped or fields
+
+    def _respond(self, messages: list[BaseMessage]) -> AIMessage:
+        system = next(m for m in messages if isinstance(m, SystemMessage))
+        max_actions = int(_MAX_ACTIONS.search(_text(system)).group(1))
+        task = ""
+        for message in messages:
+            match = _TASK.search(_text(message))
+            if isinstance(message, HumanMessage) and match:
+                task = match.group(1)
+        state = _text(messages[-1])
+
+        memory = {"filled": [], "missed": [], "up": False, "select": None}
+        for message in reversed(messages):
+            if isinstance(message, AIMessage) and message.tool_calls:
+                try:
+                    memory = json.loads(
+                        message.tool_calls[-1]["args"]["current_state"]["memory"]
+                    )
+                except (KeyError, TypeError, ValueError):
+                    pass  # the example tool call of the system prompt
+                break
+
+        elements = _parse_elements(state)
+        handled = set(memory["filled"]) | set(memory["missed"])
+        pending = [
+            (path, value)
+            for path, value in self._scope(task)
+            if ".".join(path) not in handled
+        ]
+        actions = []
+
+        if memory["select"] is not None:
+            # The options of a dropdown were requested in the previous step
+            path, index = memory["select"]
+            value = next(v for p, v in pending if ".".join(p) == path)
+            options = []
+            for line in state.splitlines():
+                match = _OPTION_LINE.match(line.strip())
+                if match:
+                    text = json.loads(match.group(1))
+                    options.append([text, text])
+            # "Massachusetts (MA)" for "MA", before "Maine (ME)" starting with "Ma"
+            option = next(
+                (text for text, _ in options if _contains_words(text, value)), None
+            ) or select_option_value(value, options)
+            if option is None:
+                memory["missed"].append(path)
+            else:
+                actions.append(
+                    {"select_dropdown_option": {"index": index, "text": option}}
+                )
+                memory["filled"].append(path)
+            memory["select"] = None
+            pending = [(p, v) for p, v in pending if ".".join(p) != path]
+
+        last_index = -1
+        for path, value in pending:
+            key = ".".join(path)
+            checked = as_checked(value)
+            if value in ("", None) or checked is False and not isinstance(value, str):
+                # Nothing to enter, the page default already matches
+                memory["filled"].append(key)
+                continue
+            scored = [(_element_score(path, element), element) for element in elements]
+            top = max((score for score, _ in scored), default=0)
+            candidates = [e for s, e in scored if s == top]
+            # Fields come in form order, so of equally good matches the first one
+            # after the previous field is meant, e.g. the client's "Given Name"
+            candidates = [
+                e for e in candidates if e["index"] > last_index
+            ] or candidates
+            if top == 0:
+                if checked is False:
+                    # "no" for a checkbox that is not in sight, leave it unchecked
+                    memory["filled"].append(key)
+                    continue
+                break  # not in view, scroll to it first
+
+            element = candidates[0]
+            items = [
+                int(part.split(" ")[1]) for part in path if part.startswith("Item ")
+            ]
+            if items and not candidates[0]["checkable"]:
+                # Repeated rows such as the Part 6 entries tie, take the row of the item
+                element = candidates[min(items[-1], len(candidates) - 1)]
+            option_group = len(candidates) > 1 and all(
+                e["checkable"] for e in candidates
+            )
+            if option_group:
+                # A checkbox group such as unit type, pick the option by its value
+                options = [
+                    e
+                    for e in candidates
+                    if any(select_option_value(value, [[t, t]]) for t in e["tokens"])
+                ]
+                if not options:
+                    memory["missed"].append(key)
+                    continue
+                element = options[0]
+            if element["tag"] == "select":
+                actions.append({"get_dropdown_options": {"index": element["index"]}})
+                memory["select"] = [key, element["index"]]
+                break
+            if element["checkable"]:
+                if checked is False and not option_group:
+                    memory["filled"].append(key)
+                    continue
+                actions.append({"click_element": {"index": element["index"]}})
+            else:
+                actions.append(
+                    {"input_text": {"index": element["index"], "text": str(value)}}
+                )
+            last_index = element["index"]
+            memory["filled"].append(key)
+            if len(actions) == max_actions:
+                break
+
+        if actions:
+            memory["up"] = False
+        handled = set(memory["filled"]) | set(memory["missed"])
+        remaining = [p for p, _ in self._scope(task) if ".".join(p) not in handled]
+        if not actions and remaining:
+            below = "pixels below" in state
+            above = "pixels above" in state
+            if below and not memory["up"]:
+                actions.append({"scroll_down": {"amount": None}})
+            elif above:
+                memory["up"] = True
+                actions.append({"scroll_up": {"amount": None}})
+            else:
+                # Searched the whole page, give up on what is left
+                memory["missed"].extend(".".join(p) for p in remaining)
+                remaining = []
+        if not actions and not remaining:
+            actions.append(
+                {
+                    "done": {
+                        "success": not memory["missed"],
+                        "description": (
+                            f"Filled {len(memory['filled'])} fields, could not find "
+                            f"{', '.join(memory['missed']) or 'none'}"
+                        ),
+                    }
+                }
+            )
+
+        args = {
+            "current_state": {
+                "evaluation_previous_goal": "Unknown",
+                "memory": json.dumps(memory),
+                "next_goal": f"Fill {len(remaining)} remaining fields",
+            },
+            "action": actions,
+        }
+        input_tokens = sum(
+            len(_text(m)) // 4 + _images(m) * _IMAGE_TOKENS for m in messages
+        )
+        output_tokens = len(json.dumps(args)) // 4
+        return AIMessage(
+            content="",
+            tool_calls=[
+                {
+                    "name": "AgentOutput",
+                    "args": args,
+                    "id": f"call_{uuid.uuid4().hex[:24]}",
+                }
+            ],
+            usage_metadata={
+                "input_tokens": input_tokens,
+                "output_tokens": output_tokens,
+                "total_tokens": input_tokens + output_tokens,
+            },
+        )
@@ -0,0 +1,82 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qs, urlparse
+
+FORM_HTML = Path(__file__).with_name("a28.html")
+
+
+class FormServer:
+    """
+    Serves the A-28 replica on localhost from a background thread and keeps the
+    latest form state each page reports, per run id, so filled values can be read
+    back after the browser context is gone.
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0):
+        self._states: dict[str, tuple[int, dict]] = {}
+        self._lock = threading.Lock()
+        self._html = FORM_HTML.read_bytes()
+        self._server = ThreadingHTTPServer((host, port), self._handler())
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if urlparse(self.path).path != "/":
+                    self.send_error(404)
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", "text/html; charset=utf-8")
+                self.send_header("Content-Length", str(len(server._html)))
+                self.end_headers()
+                self.wfile.write(server._html)
+
+            def do_POST(self):
+                url = urlparse(self.path)
+                if url.path != "/state":
+                    self.send_error(404)
+                    return
+                run = parse_qs(url.query).get("run", ["default"])[0]
+                body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                report = json.loads(body or b"{}")
+                with server._lock:
+                    # Reports can arrive out of order, keep the newest one
+                    sequence, _ = server._states.get(run, (-1, {}))
+                    if report.get("sequence", 0) > sequence:
+                        server._states[run] = (report["sequence"], report["state"])
+                self.send_response(204)
+                self.end_headers()
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    @property
+    def port(self) -> int:
+        return self._server.server_address[1]
+
+    def url(self, run: str) -> str:
+        return f"http://127.0.0.1:{self.port}/?run={run}"
+
+    def state(self, run: str) -> dict:
+        with self._lock:
+            return self._states.get(run, (-1, {}))[1]
+
+    def start(self):
+        self._thread.start()
+
+    def close(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
@@ -0,0 +1,95 @@
+import hashlib
+import json
+from pathlib import Path
+
+from playwright.async_api import Page
+from pydantic import BaseModel
+
+from direct import verify_fields
+from replay import ReplayStep, replay_script
+
+
+class FieldProgress(BaseModel):
+    path: list[str]
+    value: str | bool | int | float | None = None
+    status: str  # "done" or "failed"
+    step: ReplayStep | None = None  # how it was filled, to restore it after a reload
+
+
+def _checkpoint_file(base_url: str, form_data: dict, checkpoint_dir: str) -> Path:
+    form_digest = hashlib.sha1(base_url.encode()).hexdigest()[:16]
+    record_digest = hashlib.sha1(
+        json.dumps(form_data, sort_keys=True, default=str).encode()
+    ).hexdigest()[:16]
+    return Path(checkpoint_dir) / f"{form_digest}_{record_digest}.json"
+
+
+def load_checkpoint(
+    base_url: str, form_data: dict, checkpoint_dir: str
+) -> dict[tuple, FieldProgress]:
+    """
+    Load the progress of an earlier attempt at filling this record into this form,
+    keyed by JSON key path.
+    """
+    checkpoint_file = _checkpoint_file(base_url, form_data, checkpoint_dir)
+    if not checkpoint_file.exists():
+        return {}
+    data = json.loads(checkpoint_file.read_text())
+    fields = [FieldProgress.model_validate(field) for field in data["fields"]]
+    return {tuple(field.path): field for field in fields}
+
+
+def save_checkpoint(
+    base_url: str,
+    form_data: dict,
+    progress: dict[tuple, FieldProgress],
+    checkpoint_dir: str,
+):
+    checkpoint_file = _checkpoint_file(base_url, form_data, checkpoint_dir)
+    checkpoint_file.parent.mkdir(parents=True, exist_ok=True)
+    checkpoint_file.write_text(
+        json.dumps(
+            {
+                "base_url": base_url,
+                "fields": [field.model_dump() for field in progress.values()],
+            },
+            indent=1,
+        )
+    )
+
+
+def clear_checkpoint(base_url: str, form_data: dict, checkpoint_dir: str):
+    _checkpoint_file(base_url, form_data, checkpoint_dir).unlink(missing_ok=True)
+
+
+async def restore_checkpoint(
+    page: Page,
+    progress: dict[tuple, FieldProgress],
+    fields: list[tuple[tuple[str, ...], object]],
+) -> list[tuple[tuple[str, ...], object]]:
+    """
+    Bring the page back to the progress of an earlier attempt. Fields marked done
+    are read back from the page in one round trip, and the ones that are not there
+    anymore (e.g. after a reload) are refilled from the steps recorded for them.
+    Returns the leaves that still need an agent, in their original order.
+    """
+    done = [
+        (path, value)
+        for path, value in fields
+        if path in progress and progress[path].status == "done"
+    ]
+    mismatched, unchecked = await verify_fields(page, done)
+    stale = [field for field in done if field in mismatched or field in unchecked]
+    script = {
+        path: progress[path].step
+        for path, _ in stale
+        if progress[path].step is not None
+    }
+    not_restored = await replay_script(page, script, stale)
+    # Only what the DOM read can check, a replayed step is trusted otherwise
+    mismatched, _ = await verify_fields(
+        page, [field for field in stale if field not in not_restored]
+    )
+    not_restored += mismatched
+    complete = {path for path, _ in done} - {path for path, _ in not_restored}
+    return [(path, value) for path, value in fields if path not in complete]
@@ -0,0 +1,83 @@
+import asyncio
+import time
+
+
+class DeadlineScheduler:
+    """
+    Spreads one time budget over the stages of a run. Work is counted in leaves:
+    plan sets how many are left, and each stage gets the share of the remaining
+    time that its leaves are of the work left, stretched to a few times what
+    stages have actually taken per leaf so far. No stage runs past step_timeout or
+    the deadline. A stage that times out is retried with a bounded exponential
+    backoff while the budget lasts. Without a budget every stage gets step_timeout
+    and is not retried, the behavior of a flat timeout.
+    """
+
+    def __init__(
+        self,
+        budget: float | None,
+        step_timeout: float,
+        retries: int = 2,
+        backoff: float = 1.0,
+        max_backoff: float = 8.0,
+        slack: float = 3.0,
+    ):
+        self.deadline = time.monotonic() + budget if budget is not None else None
+        self.step_timeout = step_timeout
+        self.retries = retries if budget is not None else 0
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.slack = slack
+        self.work_left = 0.0
+        # Moving average of the seconds a stage took per leaf
+        self._seconds_per_leaf: float | None = None
+
+    def plan(self, work: float):
+        self.work_left = work
+
+    def remaining(self) -> float:
+        if self.deadline is None:
+            return float("inf")
+        return self.deadline - time.monotonic()
+
+    def timeout_for(self, work: float) -> float:
+        remaining = self.remaining()
+        if self.deadline is None:
+            return self.step_timeout
+        share = remaining * work / max(self.work_left, work, 1e-9)
+        if self._seconds_per_leaf is not None:
+            share = max(share, self.slack * self._seconds_per_leaf * work)
+        return max(0.0, min(self.step_timeout, remaining, share))
+
+    def _observe(self, seconds: float, work: float):
+        per_leaf = seconds / max(work, 1)
+        if self._seconds_per_leaf is None:
+            self._seconds_per_leaf = per_leaf
+        else:
+            self._seconds_per_leaf = 0.7 * self._seconds_per_leaf + 0.3 * per_leaf
+
+    async def run(self, make_awaitable, work: float = 1):
+        """
+        Await make_awaitable() within the timeout for work leaves, calling it again
+        after a timeout while retries and budget are left. Raises TimeoutError
+        once they are not.
+        """
+        for attempt in range(self.retries + 1):
+            timeout = self.timeout_for(work)
+            if timeout <= 0:
+                raise TimeoutError("Deadline passed")
+            start = time.monotonic()
+            try:
+                result = await asyncio.wait_for(make_awaitable(), timeout=timeout)
+            except TimeoutError:
+                # A lower bound of the latency, still worth learning from
+                self._observe(time.monotonic() - start, work)
+                delay = min(self.backoff * 2**attempt, self.max_backoff)
+                if attempt == self.retries or self.remaining() <= delay:
+                    raise
+                print(f"Timed out after {timeout:.1f} seconds, retrying in {delay:.1f}")
+                await asyncio.sleep(delay)
+                continue
+            self._observe(time.monotonic() - start, work)
+            self.work_left = max(0.0, self.work_left - work)
+            return result
@@ -1,83 +1,297 @@
 import collections.abc
+from collections.abc import Iterator
+from enum import Enum
 
+from pydantic import BaseModel
 
-def _generate_instructions_recursive(data, path, instructions):
+# Text answers that stand for a checkbox, see direct.as_checked
+_YES_NO = ("yes", "no", "y", "n")
+
+# Leaves of the A-28 that only apply when a sibling leaf is set, by key: the
+# matter of a case type, the organization of a nonprofit representative, ...
+FIELD_DEPENDENCIES = {
+    "org_name": "is_nonprofit_rep",
+    "accreditation_date": "is_nonprofit_rep",
+    "law_student": "associated_with_student",
+    "administrative_matter": "administrative_case",
+    "civil_matter": "civil_case",
+    "other_legal_matter": "other_legal",
+}
+
+
+def _is_leaf(data) -> bool:
+    return not isinstance(
+        data, (collections.abc.Mapping, collections.abc.Sequence)
+    ) or isinstance(data, str)
+
+
+class InputKind(Enum):
+    CHECKBOX = "checkbox"  # booleans and yes/no answers
+    DATE = "date"
+    NUMBER = "number"
+    TEXT = "text"
+
+
+class FieldInstruction(BaseModel):
+    path: tuple[str, ...]
+    value: str | bool | int | float | None = None
+    kind: InputKind
+    label: str  # "Family Name" for family_name
+    location: tuple[str, ...]  # readable parent keys, e.g. ("Part6", "Entry 1")
+
+
+def list_index(part: str) -> int | None:
+    """
+    The index of a list item key ("Item 0" for the first entry), or None for any
+    other key, including dict keys such as "Item Name".
+    """
+    if not part.startswith("Item "):
+        return None
+    try:
+        return int(part.split(" ")[1])
+    except (IndexError, ValueError):
+        return None
+
+
+def field_label(path) -> str:
+    """
+    The display name of a leaf, its last key with underscores replaced and title-cased.
+    """
+    return str(path[-1]).replace("_", " ").title()
+
+
+def field_location(path) -> tuple[str, ...]:
+    """
+    Readable names of the keys above a leaf, list items as 1-based "Entry N".
+    """
+    readable_parts = []
+    for part in path[:-1]:
+        index = list_index(part)
+        if index is not None:
+            readable_parts.append(f"Entry {index + 1}")  # 1-based for readability
+        else:
+            readable_parts.append(part.replace("_", " ").title())
+    return tuple(readable_parts)
+
+
+def infer_input_kind(path, data) -> InputKind:
+    """
+    Guess the kind of control a leaf goes into from its value and key.
+    """
+    if isinstance(data, bool) or (
+        isinstance(data, str) and data.strip().lower() in _YES_NO
+    ):
+        return InputKind.CHECKBOX
+    if str(path[-1]).endswith("_date"):
+        return InputKind.DATE
+    if isinstance(data, (int, float)):
+        return InputKind.NUMBER
+    return InputKind.TEXT
+
+
+def format_instruction(path, data) -> str:
     """
-    Recursive helper function to traverse the data structure and generate form-filling instructions.
-    Designed to be generic and independent of specific form data structures.
+    Render the English instruction for a single leaf value at the given key path.
+    """
+    return f'Enter "{data}" into the field "{field_label(path)}"'
+
+
+def render_instruction(instruction: FieldInstruction) -> str:
+    """
+    Render the English instruction for a structured instruction record.
+    """
+    return format_instruction(instruction.path, instruction.value)
+
+
+def _iter_fields_recursive(data, path):
+    """
+    Recursive helper generator to traverse the data structure and yield every leaf as
+    a (key path, value) pair. path is a single list extended and shrunk in place, only
+    leaves copy it.
     """
     # Base Case: Leaf node (scalar value or string)
-    if not isinstance(
-        data, (collections.abc.Mapping, collections.abc.Sequence)
-    ) or isinstance(data, str):
-        if not path:
-            return
-
-        # Extract the last key for the field name
-        field_name = str(path[-1])
-        # Create a display name by replacing underscores and title-casing
-        field_name_display = field_name.replace("_", " ").title()
-        # Convert the value to a string
-        value_str = str(data)
-
-        # Build the location string from the path (excluding the last element)
-        location_parts = path[:-1]
-        if location_parts:
-            # Clean up path parts for readability
-            readable_parts = []
-            for part in location_parts:
-                # If the part looks like an index (e.g., "Item 0"), make it more readable
-                if part.startswith("Item "):
-                    try:
-                        index = (
-                            int(part.split(" ")[1]) + 1
-                        )  # Convert to 1-based indexing
-                        readable_parts.append(f"Entry {index}")
-                    except (IndexError, ValueError):
-                        readable_parts.append(part)
-                else:
-                    readable_parts.append(part.replace("_", " ").title())
-
-        # Generate the instruction
-        instruction = f'Enter "{value_str}" into the field "{field_name_display}"'
-        # instruction = f'Locate the field "{field_name_display}"{location_str} and fill in the value "{value_str}"'
-        instructions.append(instruction)
+    if _is_leaf(data):
+        if path:
+            yield tuple(path), data
         return
 
     # Recursive Step: Dictionary
     if isinstance(data, collections.abc.Mapping):
-        for key, value in data.items():
-            _generate_instructions_recursive(value, path + [str(key)], instructions)
-
+        items = ((str(key), value) for key, value in data.items())
     # Recursive Step: List/Tuple (but not string)
-    elif isinstance(data, collections.abc.Sequence) and not isinstance(data, str):
-        for index, item in enumerate(data):
-            # Use a generic identifier for list items
-            list_item_identifier = f"Item {index}"
-            _generate_instructions_recursive(
-                item, path + [list_item_identifier], instructions
-            )
+    else:
+        # Use a generic identifier for list items
+        items = ((f"Item {index}", item) for index, item in enumerate(data))
+    for key, value in items:
+        path.append(key)
+        yield from _iter_fields_recursive(value, path)
+        path.pop()
 
 
-def get_form_instructions(form_data: dict) -> list[str]:
+def iter_form_fields(form_data: dict) -> Iterator[tuple[tuple[str, ...], object]]:
     """
-    Generate form filling instructions for an LLM agent from JSON structured form data.
+    Lazily flatten JSON structured form data into (key path, value) pairs, one per
+    leaf, in form order.
     """
     if not isinstance(form_data, collections.abc.Mapping):
         raise TypeError("Input form_data must be a dictionary.")
-    all_instructions = []
-    for key, value in form_data.items():
-        _generate_instructions_recursive(value, [str(key)], all_instructions)
-    return all_instructions
+    yield from _iter_fields_recursive(form_data, [])
+
+
+def get_form_fields(form_data: dict) -> list[tuple[tuple[str, ...], object]]:
+    """
+    Flatten JSON structured form data into (key path, value) pairs, one per leaf.
+    """
+    return list(iter_form_fields(form_data))
+
+
+def iter_form_instructions(form_data: dict) -> Iterator[FieldInstruction]:
+    """
+    Lazily yield one structured instruction record per leaf of the form data, in
+    form order. Render them with render_instruction.
+    """
+    for path, value in iter_form_fields(form_data):
+        yield FieldInstruction(
+            path=path,
+            value=value,
+            kind=infer_input_kind(path, value),
+            label=field_label(path),
+            location=field_location(path),
+        )
+
+
+def group_form_fields(fields, depth: int) -> list[tuple[tuple[str, ...], list]]:
+    """
+    Group (key path, value) leaves into sections by their key path prefix of the given
+    depth, e.g. depth 2 gives "attorney", "client" and "part6.additional_info". A leaf
+    is never its own prefix, so top-level leaves share the root section. Sections keep
+    the order in which they first appear.
+    """
+    groups = {}
+    for path, value in fields:
+        prefix = path[: min(depth, len(path) - 1)]
+        groups.setdefault(prefix, []).append((path, value))
+    return list(groups.items())
+
+
+def _empty_like(item):
+    # Stands in for a list entry before the one shown, so the position stays
+    if isinstance(item, collections.abc.Mapping):
+        return {}
+    if _is_leaf(item):
+        return None
+    return []
+
+
+def nest_fields(fields) -> dict:
+    """
+    Rebuild nested form data from (key path, value) leaves, the inverse of
+    get_form_fields for the leaves given. List items keep their position, the
+    entries before them that have no leaves are left empty.
+    """
+    root = {}
+    for path, value in fields:
+        node = root
+        for part in path[:-1]:
+            node = node.setdefault(part, {})
+        node[path[-1]] = value
+
+    def convert(node):
+        # "Item N" keys came from a list, turn them back into one
+        if not isinstance(node, dict):
+            return node
+        if node and all(list_index(key) is not None for key in node):
+            items = {list_index(key): convert(value) for key, value in node.items()}
+            return [
+                items.get(index, _empty_like(next(iter(items.values()))))
+                for index in range(max(items) + 1)
+            ]
+        return {key: convert(value) for key, value in node.items()}
+
+    return convert(root)
+
+
+def get_field_context(form_data: dict, path) -> dict:
+    """
+    The part of the form data a single leaf needs: its scalar siblings, nested under
+    the leaf's parent keys so its location in the form stays visible. A list item
+    keeps its position, the entries before it are left empty.
+    """
+    parent = form_data
+    for part in path[:-1]:
+        index = list_index(part)
+        parent = parent[part if index is None else index]
+
+    if isinstance(parent, collections.abc.Mapping):
+        context = {key: value for key, value in parent.items() if _is_leaf(value)}
+    else:
+        context = [value for value in parent if _is_leaf(value)]
+
+    for part in reversed(path[:-1]):
+        index = list_index(part)
+        if index is None:
+            context = {part: context}
+        else:
+            context = [_empty_like(context)] * index + [context]
+    return context
+
+
+def _is_blank(value) -> bool:
+    # Nothing to enter, a fresh form already holds this
+    return value is None or value is False or value == ""
+
+
+def _is_off(value) -> bool:
+    return _is_blank(value) or str(value).strip().lower() in ("no", "n", "false")
+
+
+def prune_fields(
+    fields, dependencies: dict[str, str] = FIELD_DEPENDENCIES
+) -> tuple[list, list]:
+    """
+    Split (key path, value) leaves into the ones an agent has to fill and the ones
+    that should be left blank (empty text, unchecked boxes), both in form order.
+    Leaves whose controlling sibling in dependencies is off cannot apply and are
+    dropped from both, whatever their value.
+    """
+    values = dict(fields)
+    to_fill = []
+    to_leave_blank = []
+    for path, value in fields:
+        controller = dependencies.get(path[-1])
+        if controller is not None:
+            controller_path = path[:-1] + (controller,)
+            if controller_path in values and _is_off(values[controller_path]):
+                continue
+        if _is_blank(value):
+            to_leave_blank.append((path, value))
+        else:
+            to_fill.append((path, value))
+    return to_fill, to_leave_blank
+
+
+def format_blank_instruction(fields) -> str:
+    """
+    A single instruction to check that all of the given leaves are left blank.
+    """
+    names = ", ".join(f'"{field_label(path)}"' for path, _ in fields)
+    return f"Make sure the fields {names} are empty or unchecked, change nothing else"
+
+
+def get_form_instructions(form_data: dict) -> list[str]:
+    """
+    Generate form filling instructions for an LLM agent from JSON structured form data.
+    """
+    return [
+        render_instruction(instruction)
+        for instruction in iter_form_instructions(form_data)
+    ]
 
 
 # --- Main execution block with added second entry for testing ---
 if __name__ == "__main__":
     from data import MOCK_DATA
 
-    # Need to add 'collections' import
-    import collections.abc
-
     instructions = get_form_instructions(MOCK_DATA)
     for instruction in instructions:
         print(instruction)
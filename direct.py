@@ -0,0 +1,380 @@
+import re
+
+from playwright.async_api import Error as PlaywrightError
+from playwright.async_api import Page
+
+from decompose import list_index
+
+# Collect every fillable control on the page in a single round trip. Each control
+# is tagged with a data attribute so it can be addressed again without relying on
+# ids or names being present or unique.
+_COLLECT_FIELDS_JS = """() => {
+    const fields = [];
+    const skipped = ["hidden", "submit", "button", "reset", "image", "file"];
+    document.querySelectorAll("input, select, textarea").forEach((el, index) => {
+        const type = (el.getAttribute("type") || el.tagName).toLowerCase();
+        if (skipped.includes(type) || el.disabled) return;
+        el.setAttribute("data-form-filler-index", String(index));
+        const labels = [];
+        if (el.labels) {
+            for (const label of el.labels) labels.push(label.innerText);
+        }
+        if (el.getAttribute("aria-label")) labels.push(el.getAttribute("aria-label"));
+        if (el.getAttribute("placeholder")) labels.push(el.getAttribute("placeholder"));
+        if (el.getAttribute("title")) labels.push(el.getAttribute("title"));
+        fields.push({
+            selector: `[data-form-filler-index="${index}"]`,
+            tag: el.tagName.toLowerCase(),
+            type: type,
+            id: el.id || "",
+            name: el.getAttribute("name") || "",
+            value: el.value || "",
+            checked: Boolean(el.checked),
+            label: labels.join(" ").trim(),
+            options: el.tagName === "SELECT"
+                ? Array.from(el.options).map((o) => [o.value, o.text.trim()])
+                : [],
+        });
+    });
+    return fields;
+}"""
+
+# Apply a batch of entries in a single round trip. An entry is addressed by the
+# xpath of an element from the agent's element list, or by a label matched against
+# ids, names and labels. Values are set through the native setters and announced
+# with input/change events, so script-managed inputs see them as typed.
+_FILL_ENTRIES_JS = """(entries) => {
+    const normalize = (text) =>
+        String(text).toLowerCase().split(/[^a-z0-9]+/).filter(Boolean).join("_");
+    const skipped = ["hidden", "submit", "button", "reset", "image", "file"];
+    const controls = Array.from(document.querySelectorAll("input, select, textarea"))
+        .filter((el) => {
+            const type = (el.getAttribute("type") || el.tagName).toLowerCase();
+            return !skipped.includes(type) && !el.disabled;
+        });
+    const names = (el) => {
+        const names = [el.id, el.getAttribute("name") || "",
+            el.getAttribute("aria-label") || "", el.getAttribute("placeholder") || ""];
+        if (el.labels) {
+            for (const label of el.labels) names.push(label.innerText);
+        }
+        return names.map(normalize).filter(Boolean);
+    };
+    const byLabel = (label) => {
+        const wanted = normalize(label);
+        const exact = controls.filter((el) => names(el).includes(wanted));
+        if (exact.length) return exact;
+        return controls.filter((el) => names(el).some((name) =>
+            name.startsWith(wanted + "_") || name.endsWith("_" + wanted)));
+    };
+    const byXpath = (xpath) => {
+        const el = document.evaluate(xpath, document, null,
+            XPathResult.FIRST_ORDERED_NODE_TYPE, null).singleNodeValue;
+        return el ? [el] : [];
+    };
+    const matchesOption = (value, ...candidates) => {
+        value = normalize(value);
+        return Boolean(value) && candidates.map(normalize).some((candidate) =>
+            candidate && (candidate.startsWith(value) || value.startsWith(candidate)));
+    };
+    const announce = (el) => {
+        el.dispatchEvent(new Event("input", { bubbles: true }));
+        el.dispatchEvent(new Event("change", { bubbles: true }));
+    };
+    const setValue = (el, value) => {
+        const prototype = Object.getPrototypeOf(el);
+        Object.getOwnPropertyDescriptor(prototype, "value").set.call(el, value);
+        announce(el);
+    };
+    const optionText = (el) =>
+        el.labels && el.labels.length ? el.labels[0].innerText : "";
+    return entries.map((entry) => {
+        const targets = entry.xpath ? byXpath(entry.xpath) : byLabel(entry.label || "");
+        if (!targets.length) return "not found";
+        const checkable = targets.every((el) => ["checkbox", "radio"].includes(el.type));
+        if (checkable) {
+            let states;
+            if (entry.checked !== null && targets.length === 1) {
+                states = [entry.checked];
+            } else {
+                // An option of a group, e.g. client type
+                states = targets.map((el) =>
+                    matchesOption(String(entry.value), el.value, optionText(el)));
+                if (!states.some(Boolean)) return "no matching option";
+            }
+            targets.forEach((el, i) => {
+                if (el.checked === states[i] || (el.type === "radio" && !states[i])) return;
+                el.checked = states[i];
+                announce(el);
+            });
+            return "ok";
+        }
+        if (targets.length > 1) return `ambiguous, ${targets.length} fields match`;
+        const el = targets[0];
+        let value = String(entry.value);
+        if (el.tagName === "SELECT") {
+            const options = Array.from(el.options);
+            const option = options.find((o) =>
+                    [o.value, o.text].map(normalize).includes(normalize(value)))
+                || options.find((o) => matchesOption(value, o.value, o.text));
+            if (!option) return "no matching option";
+            value = option.value;
+        } else if (el.type === "date") {
+            // Date inputs only take ISO dates
+            const us = value.match(/^(\\d{1,2})\\/(\\d{1,2})\\/(\\d{4})$/);
+            if (us) value = `${us[3]}-${us[1].padStart(2, "0")}-${us[2].padStart(2, "0")}`;
+        }
+        setValue(el, value);
+        return "ok";
+    });
+}"""
+
+_TRUTHY = {"true", "yes", "y", "on", "1", "checked"}
+_FALSY = {"false", "no", "n", "off", "0", ""}
+
+
+def _normalize(text: str) -> str:
+    return "_".join(t for t in re.split(r"[^a-z0-9]+", str(text).lower()) if t)
+
+
+def _path_tokens(path: tuple[str, ...]) -> list[str]:
+    """
+    Normalized parent path parts, with list items ("Item 0") turned into both their
+    0-based and 1-based index so `entries_1_page_number` style names still match.
+    """
+    tokens = []
+    for part in path[:-1]:
+        index = list_index(part)
+        if index is not None:
+            tokens.extend([str(index), str(index + 1)])
+        else:
+            tokens.append(_normalize(part))
+    return tokens
+
+
+def match_score(path: tuple[str, ...], field: dict) -> int:
+    """
+    Score how well a page control matches a key path. Ids and names that spell out
+    the full path win outright, a matching key suffix is strengthened by every parent
+    part it also contains, and a matching label is the weakest signal.
+    """
+    key = _normalize(path[-1])
+    full_path = _normalize("_".join(path))
+    parents = _path_tokens(path)
+    score = 0
+    for attribute in (field["id"], field["name"]):
+        norm = _normalize(attribute)
+        if not norm:
+            continue
+        if norm == full_path:
+            return 100
+        if norm == key or norm.endswith("_" + key):
+            parts = norm.split("_")
+            # Indexes only count as whole tokens, "1" should not match "a1_b"
+            present = [p for p in parents if (p in parts if p.isdigit() else p in norm)]
+            score = max(score, 10 + len(present))
+    label = _normalize(field["label"])
+    if label and (label == key or label.startswith(key + "_")):
+        score = max(score, 1)
+    return score
+
+
+def _is_checkable(field: dict) -> bool:
+    return field["type"] in ("checkbox", "radio")
+
+
+def _matches_option(value: str, *candidates: str) -> bool:
+    """
+    Loose comparison for option-like values, e.g. "Ste" vs "Ste." or
+    "Beneficiary" vs "Beneficiary/Derivative".
+    """
+    value = _normalize(value)
+    if not value:
+        return False
+    for candidate in candidates:
+        candidate = _normalize(candidate)
+        if candidate and (candidate.startswith(value) or value.startswith(candidate)):
+            return True
+    return False
+
+
+def as_checked(value) -> bool | None:
+    if isinstance(value, bool):
+        return value
+    text = str(value).strip().lower()
+    if text in _TRUTHY:
+        return True
+    if text in _FALSY:
+        return False
+    return None
+
+
+def resolve_fields(
+    fields: list[tuple[tuple[str, ...], object]], page_fields: list[dict]
+) -> tuple[list[tuple[tuple[str, ...], object, list[dict]]], list]:
+    """
+    Match each (key path, value) leaf to the page controls it should be written to.
+    Returns the resolved leaves with their target controls, and the leaves that could
+    not be matched unambiguously.
+    """
+    available = list(page_fields)
+    resolved = []
+    unresolved = []
+    for path, value in fields:
+        scores = [(match_score(path, field), field) for field in available]
+        top = max((score for score, _ in scores), default=0)
+        candidates = [field for score, field in scores if score == top]
+        if top == 0:
+            unresolved.append((path, value))
+            continue
+        if len(candidates) > 1:
+            # Only a group of checkboxes/radios may share a key, e.g. unit type or
+            # client type, and exactly one option may match the value.
+            if isinstance(value, bool) or not all(map(_is_checkable, candidates)):
+                unresolved.append((path, value))
+                continue
+            matching = [
+                field
+                for field in candidates
+                if _matches_option(str(value), field["value"], field["label"])
+            ]
+            if len(matching) > 1 or (not matching and str(value) != ""):
+                unresolved.append((path, value))
+                continue
+        for field in candidates:
+            available.remove(field)
+        resolved.append((path, value, candidates))
+    return resolved, unresolved
+
+
+def select_option_value(value, options: list[list[str]]) -> str | None:
+    """
+    Pick the option for a dropdown value, preferring exact matches so "MA" selects
+    Massachusetts rather than the first state starting with "Ma".
+    """
+    wanted = _normalize(value)
+    for option_value, option_label in options:
+        if wanted in (_normalize(option_value), _normalize(option_label)):
+            return option_value
+    for option_value, option_label in options:
+        if _matches_option(str(value), option_value, option_label):
+            return option_value
+    return None
+
+
+async def _fill_field(page: Page, value, targets: list[dict]) -> bool:
+    if _is_checkable(targets[0]):
+        checked = as_checked(value) if len(targets) == 1 else None
+        for field in targets:
+            state = checked
+            if state is None:
+                state = _matches_option(str(value), field["value"], field["label"])
+            if field["type"] == "radio" and not state:
+                continue
+            await page.set_checked(field["selector"], state)
+        return True
+
+    field = targets[0]
+    if field["tag"] == "select":
+        option_value = select_option_value(value, field["options"])
+        if option_value is None:
+            return False
+        await page.select_option(field["selector"], value=option_value)
+        return True
+
+    await page.fill(field["selector"], str(value))
+    return True
+
+
+async def fill_fields_directly(
+    page: Page, fields: list[tuple[tuple[str, ...], object]]
+) -> list[tuple[tuple[str, ...], object]]:
+    """
+    Fill every leaf that can be resolved to a page control straight through
+    Playwright, without involving the LLM. Returns the leaves that still need an
+    agent, in their original order.
+    """
+    page_fields = await page.evaluate(_COLLECT_FIELDS_JS)
+    resolved, unresolved = resolve_fields(fields, page_fields)
+    failed = []
+    for path, value, targets in resolved:
+        try:
+            if not await _fill_field(page, value, targets):
+                failed.append((path, value))
+        except PlaywrightError as e:
+            print(f"Direct fill failed for {'.'.join(path)}: {e}")
+            failed.append((path, value))
+
+    remaining = {path for path, _ in unresolved + failed}
+    return [(path, value) for path, value in fields if path in remaining]
+
+
+def _field_matches(value, targets: list[dict]) -> bool:
+    """
+    Whether the state of the controls read from the page is what _fill_field would
+    have left there for the value.
+    """
+    if _is_checkable(targets[0]):
+        checked = as_checked(value) if len(targets) == 1 else None
+        for field in targets:
+            expected = checked
+            if expected is None:
+                expected = _matches_option(str(value), field["value"], field["label"])
+            if field["checked"] != expected:
+                return False
+        return True
+
+    field = targets[0]
+    if field["tag"] == "select":
+        return field["value"] == (select_option_value(value, field["options"]) or "")
+    return field["value"] == str(value)
+
+
+async def verify_fields(
+    page: Page, fields: list[tuple[tuple[str, ...], object]]
+) -> tuple[list, list]:
+    """
+    Read every control back in a single round trip and compare it with the leaves.
+    Returns the leaves whose control holds something else, and separately the ones
+    that cannot be matched to a control unambiguously and so were not checked, both
+    in their original order.
+    """
+    page_fields = await page.evaluate(_COLLECT_FIELDS_JS)
+    resolved, unresolved = resolve_fields(fields, page_fields)
+    mismatched = {
+        path for path, value, targets in resolved if not _field_matches(value, targets)
+    }
+    unchecked = {path for path, _ in unresolved}
+    return (
+        [(path, value) for path, value in fields if path in mismatched],
+        [(path, value) for path, value in fields if path in unchecked],
+    )
+
+
+async def find_ambiguous_fields(
+    page: Page, fields: list[tuple[tuple[str, ...], object]]
+) -> set[tuple[str, ...]]:
+    """
+    Key paths of the leaves an agent is likely to get wrong from the element list
+    alone: the ones that cannot be matched to a control, and the ones spread over a
+    group of checkboxes or radios such as client type or unit type.
+    """
+    page_fields = await page.evaluate(_COLLECT_FIELDS_JS)
+    resolved, unresolved = resolve_fields(fields, page_fields)
+    return {path for path, _ in unresolved} | {
+        path for path, _, targets in resolved if len(targets) > 1
+    }
+
+
+async def fill_entries(page: Page, entries: list[dict]) -> list[str]:
+    """
+    Fill a batch of controls in a single round trip, e.g. a whole section an agent
+    decided on in one step. Each entry has the xpath of the control or a label to
+    find it by, the value, and checked for single checkboxes (see as_checked).
+    Returns a status per entry, "ok" or why it was not filled.
+    """
+    try:
+        return await page.evaluate(_FILL_ENTRIES_JS, entries)
+    except PlaywrightError as e:
+        print(f"Bulk fill failed: {e}")
+        return [f"error: {e}"] * len(entries)
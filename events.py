@@ -0,0 +1,44 @@
+import time
+from typing import Literal
+
+from pydantic import BaseModel, Field
+
+
+class StageStarted(BaseModel):
+    event: Literal["stage_started"] = "stage_started"
+    stage: str
+    time: float = Field(default_factory=time.time)
+
+
+class FieldFilled(BaseModel):
+    event: Literal["field_filled"] = "field_filled"
+    path: tuple[str, ...]
+    value: str | bool | int | float | None = None
+    stage: str
+    # Of the stage that filled it, shared by the fields it filled together
+    duration_seconds: float
+    time: float = Field(default_factory=time.time)
+
+
+class FieldFailed(BaseModel):
+    event: Literal["field_failed"] = "field_failed"
+    path: tuple[str, ...]
+    value: str | bool | int | float | None = None
+    stage: str
+    reason: str
+    time: float = Field(default_factory=time.time)
+
+
+class RunFinished(BaseModel):
+    event: Literal["run_finished"] = "run_finished"
+    success: bool
+    duration_seconds: float
+    llm_calls: int
+    input_tokens: int
+    output_tokens: int
+    fields_filled: int
+    fields_failed: int
+    time: float = Field(default_factory=time.time)
+
+
+FillEvent = StageStarted | FieldFilled | FieldFailed | RunFinished
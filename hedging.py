@@ -0,0 +1,146 @@
+import asyncio
+import time
+from collections import deque
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.outputs import ChatResult
+
+
+def _tool_choice_name(tool_choice) -> str | None:
+    """
+    The forced tool of an OpenAI or Anthropic style tool_choice, or the choice
+    itself ("auto", "any", ...) if none is forced.
+    """
+    if isinstance(tool_choice, dict):
+        return tool_choice.get("name") or tool_choice.get("function", {}).get("name")
+    return tool_choice
+
+
+def _is_valid(result: ChatResult, kwargs: dict) -> bool:
+    # A call with tools is only answered by a tool call, e.g. browser_use's output
+    if not kwargs.get("tools"):
+        return True
+    return any(
+        getattr(generation.message, "tool_calls", None)
+        for generation in result.generations
+    )
+
+
+class HedgingPolicy:
+    """
+    Duplicates model calls that take longer than the percentile of the latency of
+    the model's recent calls (at least min_delay seconds, and only once min_samples
+    calls were seen). The duplicate goes to the same model, or to another one passed
+    to wrap, e.g. the model of the other ModelType. The first valid response wins
+    and the other call is cancelled. At most max_extra duplicates per call are
+    sent, counted over every model wrapped by the policy.
+    """
+
+    def __init__(
+        self,
+        percentile: float = 0.9,
+        alternate: bool = False,
+        max_extra: float = 0.1,
+        min_samples: int = 10,
+        window: int = 100,
+        min_delay: float = 1.0,
+    ):
+        self.percentile = percentile
+        self.alternate = alternate
+        self.max_extra = max_extra
+        self.min_samples = min_samples
+        self.window = window
+        self.min_delay = min_delay
+        self.calls = 0
+        self.hedged = 0
+        self.hedge_wins = 0
+        self._wrapped: dict[tuple[int, int], BaseChatModel] = {}
+
+    def _delay(self, latencies: deque) -> float | None:
+        if len(latencies) < self.min_samples:
+            return None
+        ordered = sorted(latencies)
+        index = min(len(ordered) - 1, int(self.percentile * len(ordered)))
+        return max(self.min_delay, ordered[index])
+
+    async def _hedge(
+        self, primary: BaseChatModel, hedge_model: BaseChatModel, messages, stop, kwargs
+    ) -> ChatResult:
+        if type(hedge_model) is not type(primary):
+            # The bound tools are in the format of the primary's provider
+            kwargs = (
+                hedge_model.bind_tools(
+                    kwargs["tools"],
+                    tool_choice=_tool_choice_name(kwargs.get("tool_choice")),
+                ).kwargs
+                if kwargs.get("tools")
+                else {}
+            )
+        # Without callbacks, the response that wins is reported once, by the hedged
+        # call's run_manager; only the rate limit applies to the duplicate itself
+        if hedge_model.rate_limiter is not None:
+            await hedge_model.rate_limiter.aacquire(blocking=True)
+        return await hedge_model._agenerate(messages, stop=stop, **kwargs)
+
+    def wrap(
+        self, model: BaseChatModel, hedge_model: BaseChatModel | None = None
+    ) -> BaseChatModel:
+        """
+        A copy of model, sharing its clients, whose calls are hedged with
+        hedge_model (model itself by default).
+        """
+        hedge_model = hedge_model or model
+        key = (id(model), id(hedge_model))
+        if key in self._wrapped:
+            return self._wrapped[key]
+        latencies: deque[float] = deque(maxlen=self.window)
+        agenerate = model._agenerate
+
+        async def hedged_agenerate(messages, stop=None, run_manager=None, **kwargs):
+            self.calls += 1
+            start = time.monotonic()
+            primary = asyncio.ensure_future(
+                agenerate(messages, stop=stop, run_manager=run_manager, **kwargs)
+            )
+            hedge = None
+            try:
+                delay = self._delay(latencies)
+                if delay is not None:
+                    await asyncio.wait({primary}, timeout=delay)
+                over_budget = self.hedged + 1 > self.max_extra * self.calls
+                if delay is None or primary.done() or over_budget:
+                    result = await primary
+                    latencies.append(time.monotonic() - start)
+                    return result
+
+                self.hedged += 1
+                hedge = asyncio.ensure_future(
+                    self._hedge(model, hedge_model, messages, stop, kwargs)
+                )
+                pending = {primary, hedge}
+                while pending:
+                    done, pending = await asyncio.wait(
+                        pending, return_when=asyncio.FIRST_COMPLETED
+                    )
+                    for task in done:
+                        if task.exception() is None and _is_valid(
+                            task.result(), kwargs
+                        ):
+                            # Without the primary's latency, the time it took so
+                            # far is still a lower bound of it
+                            latencies.append(time.monotonic() - start)
+                            if task is hedge:
+                                self.hedge_wins += 1
+                            return task.result()
+                # Neither is valid, answer like the primary would have
+                return primary.result()
+            finally:
+                for task in (primary, hedge):
+                    if task is not None and not task.done():
+                        task.cancel()
+
+        hedged = model.model_copy()
+        # On the instance, the class keeps the plain _agenerate for other copies
+        object.__setattr__(hedged, "_agenerate", hedged_agenerate)
+        self._wrapped[key] = hedged
+        return hedged
@@ -0,0 +1,93 @@
+import hashlib
+import os
+import re
+import threading
+import warnings
+from pathlib import Path
+
+from langchain_core._api import LangChainBetaWarning
+from langchain_core.caches import BaseCache
+from langchain_core.load import dumps, loads
+
+# browser_use puts the wall clock into every state message, which would make
+# every key unique; a rerun must hit no matter when it runs
+_TIMESTAMP = re.compile(r"Current date and time: \d{4}-\d{2}-\d{2} \d{2}:\d{2}")
+
+
+class DiskLLMCache(BaseCache):
+    """
+    A content-addressed cache of chat model responses on local disk, for
+    `cache=` of a langchain chat model. Keys hash the model's llm_string (model
+    name, temperature, seed, bound tools) and the serialized messages, screenshots
+    included. Once the files exceed max_bytes, the least recently used ones are
+    evicted. Usage metadata is dropped from hits, so cached calls add no tokens to
+    the trace.
+    """
+
+    def __init__(self, cache_dir: str, max_bytes: int = 512 * 1024 * 1024):
+        self.cache_dir = Path(cache_dir)
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self._size = sum(path.stat().st_size for path in self._files())
+
+    def _files(self):
+        return self.cache_dir.glob("*/*.json")
+
+    def _path(self, prompt: str, llm_string: str) -> Path:
+        prompt = _TIMESTAMP.sub("Current date and time: -", prompt)
+        digest = hashlib.sha256(f"{llm_string}\0{prompt}".encode()).hexdigest()
+        return self.cache_dir / digest[:2] / f"{digest}.json"
+
+    def lookup(self, prompt: str, llm_string: str):
+        path = self._path(prompt, llm_string)
+        try:
+            text = path.read_text()
+        except OSError:
+            return None
+        try:
+            with warnings.catch_warnings():
+                warnings.simplefilter("ignore", LangChainBetaWarning)
+                generations = loads(text, allowed_objects="core")
+        except (ValueError, KeyError, TypeError):
+            # Written by an incompatible langchain version, treat as a miss
+            return None
+        # Mark it recently used for eviction
+        os.utime(path)
+        for generation in generations:
+            message = getattr(generation, "message", None)
+            if message is not None and getattr(message, "usage_metadata", None):
+                generation.message = message.model_copy(update={"usage_metadata": None})
+        return generations
+
+    def update(self, prompt: str, llm_string: str, return_val):
+        path = self._path(prompt, llm_string)
+        data = dumps(list(return_val))
+        path.parent.mkdir(exist_ok=True)
+        temporary_path = path.with_suffix(f".{os.getpid()}.tmp")
+        temporary_path.write_text(data)
+        with self._lock:
+            previous_size = path.stat().st_size if path.exists() else 0
+            # Atomic, concurrent runs never read half a file
+            temporary_path.replace(path)
+            self._size += path.stat().st_size - previous_size
+            if self._size > self.max_bytes:
+                self._evict()
+
+    def _evict(self):
+        files = sorted(
+            ((path.stat(), path) for path in self._files()),
+            key=lambda item: item[0].st_mtime,
+        )
+        # Down to 90% so not every update evicts again
+        for stat, path in files:
+            if self._size <= self.max_bytes * 0.9:
+                break
+            path.unlink(missing_ok=True)
+            self._size -= stat.st_size
+
+    def clear(self, **kwargs):
+        with self._lock:
+            for path in self._files():
+                path.unlink(missing_ok=True)
+            self._size = 0
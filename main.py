@@ -1,16 +1,60 @@
 import asyncio
 import json
+import time
+from collections.abc import AsyncIterator, Callable
 from enum import Enum
 
 from browser_use import ActionResult, Agent, Browser, BrowserConfig
+from browser_use.browser.context import BrowserContext
 from browser_use.controller.service import Controller
 from langchain_anthropic import ChatAnthropic
+from langchain_core.caches import BaseCache
+from langchain_core.language_models.chat_models import BaseChatModel
 from langchain_openai import ChatOpenAI
 from pydantic import BaseModel
 
+from artifacts import ArtifactMode, ArtifactWriter
+from checkpoint import (
+    FieldProgress,
+    clear_checkpoint,
+    load_checkpoint,
+    restore_checkpoint,
+    save_checkpoint,
+)
 from data import MOCK_DATA
-from decompose import get_form_instructions
+from deadline import DeadlineScheduler
+from decompose import (
+    InputKind,
+    format_blank_instruction,
+    format_instruction,
+    get_field_context,
+    get_form_fields,
+    group_form_fields,
+    nest_fields,
+    prune_fields,
+)
+from direct import (
+    as_checked,
+    fill_entries,
+    fill_fields_directly,
+    find_ambiguous_fields,
+    verify_fields,
+)
+from events import FieldFailed, FieldFilled, FillEvent, RunFinished, StageStarted
+from hedging import HedgingPolicy
+from memory import bound_agent_memory
+from model_pool import DEFAULT_MODEL_POOL, ModelPool
+from network import RequestRouter
 from overfit import generate_overfitted_form_instructions
+from pool import WarmContextPool
+from replay import (
+    compile_replay_steps,
+    load_replay_script,
+    replay_script,
+    save_replay_script,
+)
+from tracing import Tracer
+from vision import ScreenshotFilter
 
 
 class DoneResult(BaseModel):
@@ -18,6 +62,17 @@ class DoneResult(BaseModel):
     description: str
 
 
+class FieldEntry(BaseModel):
+    index: int | None = None  # element index, or None to find the field by label
+    label: str | None = None
+    value: str | bool | int | float
+    kind: InputKind = InputKind.TEXT
+
+
+class FillFieldsAction(BaseModel):
+    entries: list[FieldEntry]
+
+
 class ModelType(Enum):
     CLAUDE = "claude"
     CHATGPT = "chatgpt"
@@ -29,6 +84,49 @@ class PromptType(Enum):
     SINGLE_STEP = "single_step"  # english parsed from json
     DECOMPOSED = "decomposed"  # english parsed, each field is a separate step
     HYBRID = "hybrid"  # New hybrid mode
+    DIRECT = "direct"  # fields matched to the DOM and filled without the LLM
+
+
+class HybridContext(Enum):
+    FULL = "full"  # every step gets the full JSON data
+    SLICED = "sliced"  # only the field's siblings, after a prefix shared by all steps
+
+
+def _decompose(fields, group_depth: int | None) -> list[tuple[str, list]]:
+    """
+    Units of work for the per-step modes as (instructions, leaves): one per leaf, or
+    one per section of leaves sharing a key path prefix of group_depth.
+    """
+    if group_depth is None:
+        return [
+            (format_instruction(path, value), [(path, value)]) for path, value in fields
+        ]
+    return [
+        ("\n".join(format_instruction(path, value) for path, value in group), group)
+        for _, group in group_form_fields(fields, group_depth)
+    ]
+
+
+def _succeeded(agent_history_list) -> bool:
+    """
+    Whether the agent finished by reporting success through the done action.
+    """
+    for action_result in reversed(agent_history_list.action_results()):
+        if action_result.is_done:
+            return bool(json.loads(action_result.extracted_content).get("success"))
+    return False
+
+
+def _reported_failure(agent_history_list) -> str | None:
+    """
+    The description of the first done action that reported failure, if any.
+    """
+    for action_result in agent_history_list.action_results():
+        if action_result.is_done:
+            extracted_content = json.loads(action_result.extracted_content)
+            if not extracted_content.get("success"):
+                return extracted_content.get("description")
+    return None
 
 
 async def fill_form(
@@ -42,12 +140,90 @@ async def fill_form(
     prompt_type: PromptType = PromptType.JSON,
     disable_security: bool = True,
     extra_rules: str = "",
-) -> None:
-    try:
-        # Initialize the controller
+    replay_dir: str | None = None,  # replay scripts recorded from successful agents
+    browser: Browser | None = None,  # shared with other runs and left open
+    artifact_prefix: str = "agent_history",
+    context_pool: WarmContextPool | None = None,  # contexts already on the page
+    hybrid_context: HybridContext = HybridContext.FULL,
+    group_depth: int | None = None,  # one agent per section of leaves, not per leaf
+    group_max_steps: int = 20,
+    tracer: Tracer | None = None,  # records the spans and prints a summary
+    model: BaseChatModel | None = None,  # instead of the one of model_type
+    verify: bool = True,  # read the fields back, retry only the ones that differ
+    artifacts: ArtifactWriter | None = None,  # shared with other runs and left open
+    adaptive_vision: bool = False,  # text only unless a unit needs screenshots
+    checkpoint_dir: str | None = None,  # resume DECOMPOSED and HYBRID fills
+    budget: float | None = None,  # seconds for the whole run, timeout caps a stage
+    prune: bool = True,  # no agent steps for empty or inapplicable leaves
+    model_tiering: bool = False,  # plain units try fast_model first
+    fast_model: BaseChatModel | None = None,
+    llm_cache: BaseCache | None = None,  # e.g. a DiskLLMCache
+    block_resources: frozenset[str] = frozenset(),  # see RequestRouter
+    snapshot_dir: str | None = None,  # serve the page from disk after the first run
+    bounded_memory: bool = False,  # see bound_agent_memory
+    on_event: Callable[[FillEvent], None] | None = None,  # see fill_form_events
+    model_pool: ModelPool | None = None,  # shared models, optionally rate limited
+    hedging: HedgingPolicy | None = None,  # duplicate slow model calls
+) -> bool:
+    """
+    Fill the form at base_url with form_data, the way prompt_type says. Returns
+    whether the run got through every stage.
+    """
+    print_summary = tracer is not None
+    model_pool = model_pool or DEFAULT_MODEL_POOL
+    tracer = tracer or Tracer()
+    scheduler = DeadlineScheduler(budget, timeout)
+    owns_artifacts = artifacts is None
+    if owns_artifacts:
+        artifacts = ArtifactWriter()
+    run_span, run_span_token = tracer.start_span(
+        "run", base_url, prompt_type=prompt_type.value, model_type=model_type.value
+    )
+    # Whether each leaf was filled, as far as the run knows; later stages overrule
+    outcomes: dict[tuple, bool] = {}
+    last_stage = None
+
+    def on_span(span, finished):
+        nonlocal last_stage
+        if span.run_id != run_span.run_id or span.kind != "stage":
+            return
+        if finished:
+            last_stage = span
+        elif on_event is not None:
+            on_event(StageStarted(stage=span.name))
+
+    def report_fields(leaves, filled: bool, reason: str = "agent did not succeed"):
+        stage, seconds = "run", 0.0
+        if last_stage is not None:
+            stage, seconds = last_stage.name, last_stage.duration_seconds
+        for path, value in leaves:
+            outcomes[path] = filled
+            if on_event is None:
+                continue
+            if filled:
+                on_event(
+                    FieldFilled(
+                        path=path,
+                        value=value,
+                        stage=stage,
+                        duration_seconds=seconds,
+                    )
+                )
+            else:
+                on_event(
+                    FieldFailed(path=path, value=value, stage=stage, reason=reason)
+                )
+
+    tracer.listeners.append(on_span)
+    if context_pool is not None:
+        browser = context_pool.browser
+    owns_browser = browser is None
+    if owns_browser:
         browser = Browser(
             config=BrowserConfig(headless=headless, disable_security=disable_security)
         )
+    try:
+        # Initialize the controller
         controller = Controller()
 
         # Add the done action
@@ -59,37 +235,375 @@ async def fill_form(
             print(result)
             return result
 
+        # Add the bulk fill action, one step can fill a whole section
+        @controller.registry.action(
+            "Fill many form fields at once: one entry per field with its element "
+            "index (or its label if it has no index), the value and the kind of "
+            "input. Checkboxes take true/false, a group of options takes the option.",
+            param_model=FillFieldsAction,
+        )
+        async def fill_fields(params: FillFieldsAction, browser: BrowserContext):
+            selector_map = await browser.get_selector_map()
+            entries = []
+            for entry in params.entries:
+                element = selector_map.get(entry.index)
+                entries.append(
+                    {
+                        "xpath": element.xpath if element is not None else None,
+                        "label": entry.label or "",
+                        "value": (
+                            entry.value
+                            if isinstance(entry.value, bool)
+                            else str(entry.value)
+                        ),
+                        "checked": (
+                            as_checked(entry.value)
+                            if entry.kind == InputKind.CHECKBOX
+                            else None
+                        ),
+                    }
+                )
+            page = await browser.get_current_page()
+            statuses = await fill_entries(page, entries)
+            lines = [
+                f"{entry.label or f'index {entry.index}'} = {entry.value}: {status}"
+                for entry, status in zip(params.entries, statuses)
+            ]
+            filled = statuses.count("ok")
+            return ActionResult(
+                extracted_content=f"Filled {filled}/{len(statuses)} fields\n"
+                + "\n".join(lines),
+                include_in_memory=True,
+            )
+
+        # Select the smaller model for tiering, before model is set
+        if not model_tiering or fast_model is not None:
+            pass
+        elif model is not None:
+            # A model passed in serves both tiers
+            fast_model = model
+        elif model_type == ModelType.CHATGPT:
+            fast_model = model_pool.get(
+                ChatOpenAI,
+                "gpt-4o-mini",
+                temperature=temperature,
+                seed=42,
+                cache=llm_cache,
+            )
+        elif model_type == ModelType.CLAUDE:
+            fast_model = model_pool.get(
+                ChatAnthropic,
+                "claude-3-5-haiku-latest",
+                temperature=temperature,
+                cache=llm_cache,
+            )
+
         # Select the model
-        if model_type == ModelType.CHATGPT:
-            model = ChatOpenAI(model="gpt-4o", temperature=temperature, seed=42)
+        if model is not None:
+            pass
+        elif model_type == ModelType.CHATGPT:
+            model = model_pool.get(
+                ChatOpenAI,
+                "gpt-4o",
+                temperature=temperature,
+                seed=42,
+                cache=llm_cache,
+            )
         elif model_type == ModelType.CLAUDE:
-            model = ChatAnthropic(
-                model="claude-3-7-sonnet-latest", temperature=temperature
+            model = model_pool.get(
+                ChatAnthropic,
+                "claude-3-7-sonnet-latest",
+                temperature=temperature,
+                cache=llm_cache,
             )
         else:
             raise ValueError(f"Invalid model type: {model_type}")
+        if hedging is not None:
+            hedge_model = model
+            if hedging.alternate and model_type == ModelType.CHATGPT:
+                hedge_model = model_pool.get(
+                    ChatAnthropic,
+                    "claude-3-7-sonnet-latest",
+                    temperature=temperature,
+                    cache=llm_cache,
+                )
+            elif hedging.alternate and model_type == ModelType.CLAUDE:
+                hedge_model = model_pool.get(
+                    ChatOpenAI,
+                    "gpt-4o",
+                    temperature=temperature,
+                    seed=42,
+                    cache=llm_cache,
+                )
+            hedged_model = hedging.wrap(model, hedge_model)
+            if fast_model is model:
+                fast_model = hedged_model
+            elif fast_model is not None:
+                fast_model = hedging.wrap(fast_model)
+            model = hedged_model
+        pooled = context_pool is not None and context_pool.base_url == base_url
+        if pooled:
+            context = await context_pool.acquire()
+        else:
+            context = await browser.new_context()
+        # Closed however the run ends, a shared browser must not collect contexts
+        try:
+            if not pooled:
+                if block_resources or snapshot_dir:
+                    router = RequestRouter(block_resources, snapshot_dir)
+                    await router.route_context(context)
+                # Initial navigation, a plain page load needs no agent
+                try:
+                    with tracer.span("stage", "navigate"):
+                        await scheduler.run(lambda: context.navigate_to(base_url))
+                except TimeoutError:
+                    print(
+                        f"Timeout after {timeout} seconds while trying to navigate to {base_url}"
+                    )
+                    return False
+            screenshot_filter = None
+            if adaptive_vision:
+                # Before the tracer so the DOM hash counts as screenshot time
+                screenshot_filter = ScreenshotFilter()
+                screenshot_filter.instrument_context(context)
+            tracer.instrument_context(context)
 
-        async with await browser.new_context() as context:
-            # Initial navigation
-            nav_task = f"Navigate to: '{base_url}'."
-            agent = Agent(
-                task=nav_task,
-                llm=model,
-                max_actions_per_step=100,
-                controller=controller,
-                browser=browser,
-                browser_context=context,
-                use_vision=False,
+            fields = get_form_fields(form_data)
+            if prune:
+                value_fields, blank_fields = prune_fields(fields)
+            else:
+                value_fields, blank_fields = fields, []
+            # Pruned leaves that cannot apply are not checked either
+            kept = {path for path, _ in value_fields + blank_fields}
+            checked_fields = [field for field in fields if field[0] in kept]
+            blank_units = (
+                [(format_blank_instruction(blank_fields), blank_fields)]
+                if blank_fields and not verify
+                else []
             )
-            try:
-                await asyncio.wait_for(agent.run(max_steps=100), timeout=timeout)
-            except TimeoutError:
-                print(
-                    f"Timeout after {timeout} seconds while trying to navigate to {base_url}"
+            scheduler.plan(len(value_fields))
+            # The verify stage reads the fields back, so agents need not check
+            json_verify_rule = (
+                ""
+                if verify
+                else "\n- After filling out the form, verify that all fields are filled out correctly."
+            )
+            field_verify_rule = (
+                ""
+                if verify
+                else "\n- After filling the field, verify it was filled correctly."
+            )
+            # Replay steps of successful agents, compiled as they finish so their
+            # histories need not outlive them
+            recorded_steps = []
+            script = load_replay_script(base_url, replay_dir) if replay_dir else {}
+            ambiguous = set()
+            if adaptive_vision or model_tiering:
+                page = await context.get_current_page()
+                ambiguous = await find_ambiguous_fields(page, fields)
+
+            checkpointing = checkpoint_dir is not None and prompt_type in (
+                PromptType.DECOMPOSED,
+                PromptType.HYBRID,
+            )
+            progress = (
+                load_checkpoint(base_url, form_data, checkpoint_dir)
+                if checkpointing
+                else {}
+            )
+
+            def record_progress(
+                leaves, status, agent_history_list=None, reason="agent did not succeed"
+            ):
+                report_fields(leaves, status == "done", reason)
+                if not checkpointing:
+                    return
+                steps = {}
+                if agent_history_list is not None:
+                    steps = {
+                        tuple(step.path): step
+                        for step in compile_replay_steps(agent_history_list, leaves)
+                    }
+                for path, value in leaves:
+                    progress[path] = FieldProgress(
+                        path=list(path),
+                        value=value,
+                        status=status,
+                        step=steps.get(path),
+                    )
+                save_checkpoint(base_url, form_data, progress, checkpoint_dir)
+
+            async def pending_units(units):
+                # Every unit on a first attempt, otherwise the ones with a field the
+                # checkpoint could not restore
+                if not progress:
+                    return list(enumerate(units))
+                page = await context.get_current_page()
+                with tracer.span("stage", "restore"):
+                    incomplete = {
+                        path
+                        for path, _ in await restore_checkpoint(page, progress, fields)
+                    }
+                pending = [
+                    (i, unit)
+                    for i, unit in enumerate(units)
+                    if any(path in incomplete for path, _ in unit[1])
+                ]
+                scheduler.plan(sum(len(unit[1]) for _, unit in pending))
+                if pending:
+                    print(f"Resuming from step {pending[0][0] + 1}/{len(units)}")
+                return pending
+
+            def record_steps(agent_history_list, leaves):
+                if replay_dir:
+                    recorded_steps.extend(
+                        compile_replay_steps(agent_history_list, leaves)
+                    )
+
+            def stage_vision(leaves) -> bool:
+                if not adaptive_vision:
+                    return use_vision
+                return any(path in ambiguous for path, _ in leaves)
+
+            def unit_attempts(leaves) -> list[tuple[BaseChatModel, bool]]:
+                # (model, use_vision) of every try at a unit, each one escalating
+                # after the previous one reported failure
+                vision = stage_vision(leaves)
+                attempts = []
+                simple = not any(path in ambiguous for path, _ in leaves)
+                if model_tiering and fast_model is not model and simple:
+                    attempts.append((fast_model, vision))
+                attempts.append((model, vision))
+                if adaptive_vision and not vision:
+                    attempts.append((model, True))
+                return attempts
+
+            async def run_agent_stage(name, agent, max_steps, artifact_path, work):
+                tracer.instrument_agent(agent)
+                if bounded_memory:
+                    bound_agent_memory(agent)
+                if screenshot_filter is not None:
+                    screenshot_filter.reset(agent.settings.use_vision)
+                with tracer.span("stage", name) as stage_span:
+                    try:
+                        # A retry continues the same agent, with its memory
+                        agent_history_list = await scheduler.run(
+                            lambda: agent.run(max_steps=max_steps), work
+                        )
+                    finally:
+                        start = time.perf_counter()
+                        artifacts.write(agent, artifact_path)
+                        tracer.add(artifact_seconds=time.perf_counter() - start)
+                    stage_span.success = _succeeded(agent_history_list)
+                return agent_history_list
+
+            async def fill_with_agent(remaining, artifact_path, vision):
+                steps = [format_instruction(path, value) for path, value in remaining]
+                agent = Agent(
+                    task=f"Extra rules:\n{extra_rules}\n\n" + "\n".join(steps),
+                    llm=model,
+                    max_actions_per_step=10,
+                    controller=controller,
+                    browser=browser,
+                    browser_context=context,
+                    use_vision=vision,
                 )
-                return
+                try:
+                    agent_history_list = await run_agent_stage(
+                        f"agent ({len(remaining)} fields)",
+                        agent,
+                        100,
+                        artifact_path,
+                        len(remaining),
+                    )
+                except TimeoutError:
+                    report_fields(remaining, False, "timed out")
+                    raise
+                report_fields(remaining, _succeeded(agent_history_list))
+                if _succeeded(agent_history_list):
+                    record_steps(agent_history_list, remaining)
+
+            async def fill_units(units, unit_task, max_actions, max_steps) -> bool:
+                # One agent per pending unit, each escalating through unit_attempts
+                # until one succeeds. max_actions and max_steps are for a single
+                # leaf, sections get 10 and group_max_steps. Returns False once the
+                # last attempt at a unit reports failure or times out.
+                for i, (step, step_fields) in await pending_units(units):
+                    print(f"Processing step {i + 1}/{len(units)}: {step}")
+                    task = unit_task(step, step_fields)
+                    single = len(step_fields) == 1
+                    attempts = unit_attempts(step_fields)
+                    for attempt, (llm, vision) in enumerate(attempts):
+                        last = attempt == len(attempts) - 1
+                        agent = Agent(
+                            task=task,
+                            llm=llm,
+                            max_actions_per_step=max_actions if single else 10,
+                            controller=controller,
+                            browser=browser,
+                            browser_context=context,
+                            use_vision=vision,
+                        )
+                        try:
+                            agent_history_list = await run_agent_stage(
+                                f"{prompt_type.value} {i + 1}/{len(units)}",
+                                agent,
+                                max_steps if single else group_max_steps,
+                                f"{artifact_prefix}_{model_type.value}_{prompt_type.value}_{i}"
+                                + (f"_attempt{attempt}" if attempt else ""),
+                                len(step_fields),
+                            )
+                        except TimeoutError:
+                            print(f"Timeout after {timeout} seconds on step: {step}")
+                            if not last:
+                                continue
+                            record_progress(step_fields, "failed", reason="timed out")
+                            return False
+                        if _succeeded(agent_history_list):
+                            record_steps(agent_history_list, step_fields)
+                            record_progress(step_fields, "done", agent_history_list)
+                            break
+                        # Reported failure or ran out of steps, either escalates
+                        print(f"Step failed: {step}")
+                        failure = _reported_failure(agent_history_list)
+                        if failure is not None:
+                            print(f"Extracted content: {failure}")
+                        if not last:
+                            continue
+                        if failure is not None:
+                            record_progress(
+                                step_fields, "failed", reason="agent reported failure"
+                            )
+                            return False
+                        # Out of steps on the last attempt, verify may still fix it
+                        record_progress(step_fields, "failed", agent_history_list)
+                return True
+
+            if script:
+                # Replay the steps recorded for this form, no LLM calls
+                page = await context.get_current_page()
+                with tracer.span("stage", "replay"):
+                    remaining = await replay_script(page, script, fields)
+                replayed = {path for path, _ in fields} - {
+                    path for path, _ in remaining
+                }
+                report_fields([field for field in fields if field[0] in replayed], True)
+                print(f"Replayed {len(fields) - len(remaining)}/{len(fields)} fields")
+                scheduler.plan(len(remaining))
+                if remaining:
+                    try:
+                        await fill_with_agent(
+                            remaining,
+                            f"{artifact_prefix}_{model_type.value}_replay",
+                            stage_vision(remaining),
+                        )
+                    except TimeoutError:
+                        print(
+                            f"Timeout after {timeout} seconds while trying to fill form at {base_url}"
+                        )
+                        return False
 
-            if prompt_type == PromptType.OVERFIT:
+            elif prompt_type == PromptType.OVERFIT:
                 task = generate_overfitted_form_instructions(form_data)
 
                 agent = Agent(
@@ -99,16 +613,25 @@ async def fill_form(
                     controller=controller,
                     browser=browser,
                     browser_context=context,
-                    use_vision=use_vision,
-                    generate_gif=f"agent_history_{model_type.value}_{prompt_type.value}.gif",
+                    use_vision=stage_vision([]),
                 )
                 try:
-                    await asyncio.wait_for(agent.run(max_steps=100), timeout=timeout)
+                    agent_history_list = await run_agent_stage(
+                        prompt_type.value,
+                        agent,
+                        100,
+                        f"{artifact_prefix}_{model_type.value}_{prompt_type.value}",
+                        len(fields),
+                    )
+                    report_fields(fields, _succeeded(agent_history_list))
+                    if _succeeded(agent_history_list):
+                        record_steps(agent_history_list, fields)
                 except TimeoutError:
+                    report_fields(fields, False, "timed out")
                     print(
                         f"Timeout after {timeout} seconds while trying to fill form at {base_url}"
                     )
-                    return
+                    return False
 
             elif prompt_type == PromptType.JSON:
                 task = f"""Complete the form on the page using the following JSON data as the source of truth.
@@ -122,7 +645,7 @@ Rules:
 - NEVER fill out any fields that are not present in the JSON data.
 - ALWAYS fill out fields in the SAME order they appear in the JSON data.
 - Infer the input type from the content of the page and the field name/type. For example, booleans are often checkboxes.
-- After filling out the form, verify that all fields are filled out correctly.
+- Fill all the visible fields of a section with one fill_fields action.{json_verify_rule}
 
 {"Extra rules:" if extra_rules else ""}{extra_rules}
 
@@ -135,20 +658,34 @@ JSON data:
                     controller=controller,
                     browser=browser,
                     browser_context=context,
-                    use_vision=use_vision,
-                    generate_gif=f"agent_history_{model_type.value}_{prompt_type.value}.gif",
+                    use_vision=stage_vision([]),
                 )
                 try:
-                    await asyncio.wait_for(agent.run(max_steps=100), timeout=timeout)
+                    agent_history_list = await run_agent_stage(
+                        prompt_type.value,
+                        agent,
+                        100,
+                        f"{artifact_prefix}_{model_type.value}_{prompt_type.value}",
+                        len(fields),
+                    )
+                    report_fields(fields, _succeeded(agent_history_list))
+                    if _succeeded(agent_history_list):
+                        record_steps(agent_history_list, fields)
                 except TimeoutError:
+                    report_fields(fields, False, "timed out")
                     print(
                         f"Timeout after {timeout} seconds while trying to fill form at {base_url}"
                     )
-                    return
+                    return False
 
             elif prompt_type == PromptType.SINGLE_STEP:
-                steps = get_form_instructions(form_data)
-                task = "\n".join([nav_task] + steps)
+                steps = [
+                    format_instruction(path, value) for path, value in value_fields
+                ]
+                steps += [step for step, _ in blank_units]
+                nav_task = f"Navigate to: '{base_url}'."
+                bulk_task = "Fill all the visible fields of a section with one fill_fields action."
+                task = "\n".join([nav_task, bulk_task] + steps)
                 agent = Agent(
                     task=f"Extra rules:\n{extra_rules}\n\n{task}",
                     llm=model,
@@ -156,100 +693,321 @@ JSON data:
                     controller=controller,
                     browser=browser,
                     browser_context=context,
-                    use_vision=use_vision,
-                    generate_gif=f"agent_history_{model_type.value}_{prompt_type.value}.gif",
+                    use_vision=stage_vision([]),
                 )
                 try:
-                    await asyncio.wait_for(agent.run(max_steps=100), timeout=timeout)
+                    agent_history_list = await run_agent_stage(
+                        prompt_type.value,
+                        agent,
+                        100,
+                        f"{artifact_prefix}_{model_type.value}_{prompt_type.value}",
+                        len(fields),
+                    )
+                    report_fields(value_fields, _succeeded(agent_history_list))
+                    if _succeeded(agent_history_list):
+                        record_steps(agent_history_list, fields)
                 except TimeoutError:
+                    report_fields(value_fields, False, "timed out")
                     print(
                         f"Timeout after {timeout} seconds while trying to fill form at {base_url}"
                     )
-                    return
+                    return False
 
             elif prompt_type == PromptType.DECOMPOSED:
-                steps = get_form_instructions(form_data)
-                for i, step in enumerate(steps):
-                    print(f"{step=}")
-                    agent = Agent(
-                        task=f"Extra rules:\n{extra_rules}\n\n{step}",
-                        llm=model,
-                        max_actions_per_step=10,
-                        controller=controller,
-                        browser=browser,
-                        browser_context=context,
-                        use_vision=use_vision,
-                        generate_gif=f"agent_history_{model_type.value}_{prompt_type.value}_{i}.gif",
-                    )
-                    try:
-                        agent_history_list = await asyncio.wait_for(
-                            agent.run(max_steps=5), timeout=timeout
-                        )
-                        for action_result in agent_history_list.action_results():
-                            if action_result.is_done:
-                                extracted_content = json.loads(
-                                    action_result.extracted_content
-                                )
-                                if not extracted_content.get("success"):
-                                    print(f"Step failed: {step}")
-                                    print(
-                                        f"Extracted content: {extracted_content.get('description')}"
-                                    )
-                                    return
-                    except TimeoutError:
-                        print(f"Timeout after {timeout} seconds on step: {step}")
-                        return
+                units = _decompose(value_fields, group_depth) + blank_units
+                if not await fill_units(
+                    units,
+                    lambda step, _: f"Extra rules:\n{extra_rules}\n\n{step}",
+                    10,
+                    5,
+                ):
+                    return False
 
             elif prompt_type == PromptType.HYBRID:
-                steps = get_form_instructions(form_data)
-                for i, step in enumerate(steps):
-                    print(f"Processing step {i + 1}/{len(steps)}: {step}")
-                    task = f"""Use the following JSON data as the source of truth to complete the form on the page.
+                units = _decompose(value_fields, group_depth) + blank_units
+                hybrid_sliced_prefix = f"""Use the following JSON data as the source of truth to complete the form on the page.
+
+- Your task is to fill out ONLY the field specified by current step.
+- The JSON data only contains the section of the form the current step belongs to. Empty list entries stand for the entries before it, so the position of the entry in the list is its position on the form.
+- If the field from the current step is not found in the JSON or on the page, report it and mark the task as done with success=False.
+- Infer the input type (e.g., text, checkbox) from the page content and field name/type.{field_verify_rule}
+
+{"Extra rules:" if extra_rules else ""}{extra_rules}"""
+
+                def hybrid_task(step, step_fields):
+                    if len(step_fields) == 1:
+                        field_context = get_field_context(form_data, step_fields[0][0])
+                        step_header = "CURRENT STEP (fill this and ONLY this field):"
+                    else:
+                        field_context = nest_fields(step_fields)
+                        step_header = "CURRENT STEPS (fill these and ONLY these fields, in order):"
+                    if hybrid_context == HybridContext.SLICED:
+                        # Everything before the JSON slice is byte-identical across
+                        # steps and records so provider prompt caching can hit
+                        return f"""{hybrid_sliced_prefix}
+
+JSON data:
+{json.dumps(field_context, indent=1)}
+
+{step_header}
+    {step}"""
+                    else:
+                        return f"""Use the following JSON data as the source of truth to complete the form on the page.
 
 - Your task is to fill out ONLY the field specified by current step.
 - Use the full JSON data to understand the context and ensure accuracy.
 - If the field from the current step is not found in the JSON or on the page, report it and mark the task as done with success=False.
-- Infer the input type (e.g., text, checkbox) from the page content and field name/type.
-- After filling the field, verify it was filled correctly.
+- Infer the input type (e.g., text, checkbox) from the page content and field name/type.{field_verify_rule}
 
 Full JSON data:
 {json.dumps(form_data, indent=1)}
 
 {"Extra rules:" if extra_rules else ""}{extra_rules}
 
-CURRENT STEP (fill this and ONLY this field):
+{step_header}
     {step}"""
 
-                    agent = Agent(
-                        task=task,
-                        llm=model,
-                        max_actions_per_step=3,
-                        controller=controller,
-                        browser=browser,
-                        browser_context=context,
-                        use_vision=use_vision,
-                        generate_gif=f"agent_history_{model_type.value}_{prompt_type.value}_{i}.gif",
+                if not await fill_units(units, hybrid_task, 3, 3):
+                    return False
+
+            elif prompt_type == PromptType.DIRECT:
+                page = await context.get_current_page()
+                with tracer.span("stage", "direct fill"):
+                    unresolved = await fill_fields_directly(page, value_fields)
+                report_fields(
+                    [field for field in value_fields if field not in unresolved], True
+                )
+                print(
+                    f"Filled {len(value_fields) - len(unresolved)}/{len(value_fields)} "
+                    f"fields directly"
+                )
+                scheduler.plan(len(unresolved))
+                # Hand only the fields that could not be matched to the agent
+                if unresolved:
+                    try:
+                        await fill_with_agent(
+                            unresolved,
+                            f"{artifact_prefix}_{model_type.value}_{prompt_type.value}",
+                            # Fields DIRECT could not resolve get vision
+                            adaptive_vision or use_vision,
+                        )
+                    except TimeoutError:
+                        print(
+                            f"Timeout after {timeout} seconds while trying to fill form at {base_url}"
+                        )
+                        return False
+
+            def report_verified(mismatched, unchecked):
+                # Read back as in form_data, whatever the agent that filled them
+                # reported; the ones already counted as filled are not repeated,
+                # and the ones verify could not read keep what their stage reported
+                not_matched = {path for path, _ in mismatched + unchecked}
+                report_fields(
+                    [
+                        (path, value)
+                        for path, value in checked_fields
+                        if path not in not_matched and not outcomes.get(path)
+                    ],
+                    True,
+                )
+
+            def unverified(mismatched, unchecked):
+                # Leaves verify could not read back only pass if the stage that
+                # filled them reported success; blank ones had nothing to fill
+                blank = {path for path, _ in blank_fields}
+                failed = {path for path, _ in mismatched} | {
+                    path
+                    for path, _ in unchecked
+                    if path not in blank and not outcomes.get(path)
+                }
+                return [field for field in checked_fields if field[0] in failed]
+
+            verified = True
+            if verify:
+                page = await context.get_current_page()
+                with tracer.span("stage", "verify") as verify_span:
+                    mismatched, unchecked = await verify_fields(page, checked_fields)
+                    failed = unverified(mismatched, unchecked)
+                    verify_span.success = not failed
+                report_verified(mismatched, unchecked)
+                report_fields(mismatched, False, "differs from form_data")
+                if failed:
+                    print(
+                        f"Retrying fields that differ from form_data or could not "
+                        f"be checked: {', '.join('.'.join(path) for path, _ in failed)}"
                     )
                     try:
-                        agent_history_list = await asyncio.wait_for(
-                            agent.run(max_steps=3), timeout=timeout
+                        await fill_with_agent(
+                            failed,
+                            f"{artifact_prefix}_{model_type.value}_retry",
+                            adaptive_vision or use_vision,
                         )
-                        for action_result in agent_history_list.action_results():
-                            if action_result.is_done:
-                                extracted_content = json.loads(
-                                    action_result.extracted_content
-                                )
-                                if not extracted_content.get("success"):
-                                    print(f"Step failed: {step}")
-                                    print(
-                                        f"Extracted content: {extracted_content.get('description')}"
-                                    )
-                                    return
                     except TimeoutError:
-                        print(f"Timeout after {timeout} seconds on step: {step}")
-                        return
+                        print(
+                            f"Timeout after {timeout} seconds while retrying fields at {base_url}"
+                        )
+                        return False
+                    with tracer.span("stage", "verify") as verify_span:
+                        mismatched, unchecked = await verify_fields(
+                            page, checked_fields
+                        )
+                        failed = unverified(mismatched, unchecked)
+                        verify_span.success = not failed
+                    report_verified(mismatched, unchecked)
+                    if failed:
+                        print(
+                            f"Fields still not verified after retry: "
+                            f"{', '.join('.'.join(path) for path, _ in failed)}"
+                        )
+                        verified = False
+                        record_progress(failed, "failed", reason="not verified")
+
+            if verified and checkpointing:
+                clear_checkpoint(base_url, form_data, checkpoint_dir)
+
+            if replay_dir and recorded_steps:
+                save_replay_script(base_url, recorded_steps, replay_dir)
+        finally:
+            await context.close()
+        run_span.success = verified
+        return verified
+    finally:
+        if owns_browser:
+            await browser.close()
+        tracer.end_span(run_span, run_span_token)
+        tracer.listeners.remove(on_span)
+        if owns_artifacts:
+            # After the run span, waiting for GIFs is not part of the fill
+            await artifacts.close()
+        if print_summary:
+            print(tracer.format_summary(run_span.run_id))
+        if on_event is not None:
+            on_event(
+                RunFinished(
+                    success=bool(run_span.success),
+                    duration_seconds=run_span.duration_seconds,
+                    llm_calls=run_span.llm_calls,
+                    input_tokens=run_span.input_tokens,
+                    output_tokens=run_span.output_tokens,
+                    fields_filled=sum(outcomes.values()),
+                    fields_failed=len(outcomes) - sum(outcomes.values()),
+                )
+            )
+
+
+async def fill_form_events(
+    base_url: str, form_data: dict, timeout: float, **kwargs
+) -> AsyncIterator[FillEvent]:
+    """
+    fill_form as an async iterator of its events, as they happen: StageStarted,
+    FieldFilled and FieldFailed (a field can be reported again by a later stage,
+    e.g. failed by verify and filled by the retry; the last event counts), and
+    RunFinished with the totals last. Leaving the loop early cancels the run.
+    Exceptions of fill_form are raised once its events are consumed. Remaining
+    keyword arguments are passed through to fill_form.
+    """
+    events: asyncio.Queue[FillEvent | None] = asyncio.Queue()
+
+    async def run():
+        try:
+            return await fill_form(
+                base_url, form_data, timeout, on_event=events.put_nowait, **kwargs
+            )
+        finally:
+            events.put_nowait(None)
+
+    task = asyncio.create_task(run())
+    try:
+        while (event := await events.get()) is not None:
+            yield event
+        await task
+    finally:
+        if not task.done():
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+
+
+class FillResult(BaseModel):
+    index: int
+    success: bool
+    duration_seconds: float
+    error: str | None = None
+
+
+async def fill_form_batch(
+    base_url: str,
+    records: list[dict],
+    timeout: float,
+    concurrency: int = 4,
+    headless: bool = True,
+    disable_security: bool = True,
+    warm_contexts: int = 0,
+    artifact_mode: ArtifactMode = ArtifactMode.GIF,
+    **kwargs,
+) -> list[FillResult]:
+    """
+    Fill one form per record, sharing a single browser. Each record runs in its own
+    browser context, with at most `concurrency` records in flight. With
+    warm_contexts, that many contexts are kept loaded on base_url ahead of time,
+    through the same block_resources and snapshot_dir as the records.
+    Artifacts of all records are written by one writer, so GIFs of finished records
+    are encoded while later ones are still being filled.
+    Remaining keyword arguments are passed through to fill_form.
+    """
+    browser = Browser(
+        config=BrowserConfig(headless=headless, disable_security=disable_security)
+    )
+    context_pool = None
+    if warm_contexts:
+        router = None
+        if kwargs.get("block_resources") or kwargs.get("snapshot_dir"):
+            router = RequestRouter(
+                kwargs.get("block_resources", frozenset()), kwargs.get("snapshot_dir")
+            )
+        context_pool = WarmContextPool(
+            browser, base_url, size=warm_contexts, router=router
+        )
+        await context_pool.start()
+    artifacts = ArtifactWriter(artifact_mode)
+    semaphore = asyncio.Semaphore(concurrency)
+    # Every record gets its own artifacts, numbered after the prefix
+    artifact_prefix = kwargs.pop("artifact_prefix", "agent_history")
+
+    async def fill_record(index: int, form_data: dict) -> FillResult:
+        async with semaphore:
+            start = time.perf_counter()
+            error = None
+            try:
+                success = await fill_form(
+                    base_url,
+                    form_data,
+                    timeout,
+                    browser=browser,
+                    artifact_prefix=f"{artifact_prefix}_{index}",
+                    context_pool=context_pool,
+                    artifacts=artifacts,
+                    **kwargs,
+                )
+            except Exception as e:
+                success = False
+                error = f"{type(e).__name__}: {e}"
+                print(f"Record {index} failed: {error}")
+            return FillResult(
+                index=index,
+                success=success,
+                duration_seconds=time.perf_counter() - start,
+                error=error,
+            )
+
+    try:
+        return await asyncio.gather(
+            *(fill_record(i, form_data) for i, form_data in enumerate(records))
+        )
     finally:
-        browser.close()
+        if context_pool is not None:
+            await context_pool.close()
+        await browser.close()
+        await artifacts.close()
 
 
 if __name__ == "__main__":
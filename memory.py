@@ -0,0 +1,86 @@
+import asyncio
+import os
+import resource
+import sys
+
+from browser_use import Agent
+from browser_use.agent.views import AgentHistoryList
+
+
+def compact_history(history_list: AgentHistoryList, keep_screenshots: int = 0):
+    """
+    Drop what the steps of a history no longer need in place: the screenshots of
+    all but the last keep_screenshots steps, and the layout of every element an
+    action touched. The model outputs, results and the attributes and selectors of
+    interacted elements stay, which is what done, replay and the frame log read.
+    """
+    history = history_list.history
+    for index, item in enumerate(history):
+        if index < len(history) - keep_screenshots:
+            item.state.screenshot = None
+        for element in item.state.interacted_element:
+            if element is None:
+                continue
+            element.entire_parent_branch_path = []
+            element.page_coordinates = None
+            element.viewport_coordinates = None
+            element.viewport_info = None
+
+
+def bound_agent_memory(agent: Agent, keep_screenshots: int = 3) -> Agent:
+    """
+    Compact the agent's history after every step, so an agent holds the
+    screenshots of its last keep_screenshots steps at most, however long it runs.
+    A GIF artifact of the agent then only shows those steps.
+    """
+    step = agent.step
+
+    async def bounded_step(step_info=None):
+        try:
+            await step(step_info)
+        finally:
+            compact_history(agent.state.history, keep_screenshots)
+
+    agent.step = bounded_step
+    return agent
+
+
+def current_rss() -> int:
+    """
+    Resident set size of this process in bytes.
+    """
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except OSError:
+        # No procfs (e.g. macOS), the peak so far is the closest there is
+        usage = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return usage if sys.platform == "darwin" else usage * 1024
+
+
+class PeakRSS:
+    """
+    Samples the resident set size in the background while the block runs. The
+    browser is a separate process and not included.
+    """
+
+    def __init__(self, interval: float = 0.05):
+        self.interval = interval
+        self.start = self.peak = self.end = 0
+        self._task: asyncio.Task | None = None
+
+    async def _sample(self):
+        while True:
+            self.peak = max(self.peak, current_rss())
+            await asyncio.sleep(self.interval)
+
+    async def __aenter__(self):
+        self.start = self.peak = current_rss()
+        self._task = asyncio.create_task(self._sample())
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        self._task.cancel()
+        await asyncio.gather(self._task, return_exceptions=True)
+        self.end = current_rss()
+        self.peak = max(self.peak, self.end)
@@ -0,0 +1,216 @@
+import asyncio
+import time
+import weakref
+from collections import deque
+
+from langchain_core.callbacks import AsyncCallbackHandler
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.rate_limiters import BaseRateLimiter
+
+from tracing import LLM_TIMING_CALLBACK, current_run_id, record_queue_wait
+
+
+class _Bucket:
+    """
+    A token bucket refilled continuously at per_minute, holding at most one
+    minute's worth. Without a limit it is never empty.
+    """
+
+    def __init__(self, per_minute: float | None):
+        self.per_minute = per_minute
+        self.level = per_minute or 0.0
+        self.updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.level = min(
+            self.per_minute, self.level + (now - self.updated) * self.per_minute / 60
+        )
+        self.updated = now
+
+    def wait_for(self, amount: float) -> float:
+        """
+        Seconds until amount can be taken.
+        """
+        if self.per_minute is None:
+            return 0.0
+        self._refill()
+        return max(0.0, (amount - self.level) * 60 / self.per_minute)
+
+    def take(self, amount: float):
+        if self.per_minute is not None:
+            self._refill()
+            self.level -= amount
+
+
+class TokenBucketRateLimiter(BaseRateLimiter):
+    """
+    Shared requests-per-minute and tokens-per-minute budgets for the `rate_limiter`
+    of chat models. A request waits for one request token and for the token bucket
+    not to be in debt; the tokens a response reports are taken once it arrives, so
+    large prompts slow down the requests after them. Waiting requests are granted
+    round-robin across runs (tracer run ids), so one run with many calls in flight
+    cannot starve the others.
+    """
+
+    def __init__(
+        self,
+        requests_per_minute: float | None = None,
+        tokens_per_minute: float | None = None,
+    ):
+        self.requests = _Bucket(requests_per_minute)
+        self.tokens = _Bucket(tokens_per_minute)
+        self._waiting: dict[str | None, deque[asyncio.Future]] = {}
+        self._turns: deque[str | None] = deque()
+        self._dispatcher: asyncio.Task | None = None
+        self.granted = 0
+        self.queue_seconds = 0.0
+        self.max_queue_seconds = 0.0
+
+    def _wait(self) -> float:
+        return max(self.requests.wait_for(1), self.tokens.wait_for(0))
+
+    def _record(self, waited: float):
+        self.granted += 1
+        self.queue_seconds += waited
+        self.max_queue_seconds = max(self.max_queue_seconds, waited)
+
+    def add_tokens(self, tokens: int):
+        self.tokens.take(tokens)
+
+    async def _dispatch(self):
+        while self._turns:
+            run_id = self._turns[0]
+            waiters = self._waiting[run_id]
+            # Callers that gave up (cancelled) lose their place
+            while waiters and waiters[0].done():
+                waiters.popleft()
+            if not waiters:
+                self._turns.popleft()
+                del self._waiting[run_id]
+                continue
+            wait = self._wait()
+            if wait > 0:
+                await asyncio.sleep(wait)
+                continue
+            # Taken here, before the waiter resumes and the next one is checked
+            self.requests.take(1)
+            waiters.popleft().set_result(None)
+            self._turns.rotate(-1)
+
+    def acquire(self, *, blocking: bool = True) -> bool:
+        # Synchronous callers are not queued, they poll
+        start = time.monotonic()
+        while (wait := self._wait()) > 0:
+            if not blocking:
+                return False
+            time.sleep(wait)
+        self.requests.take(1)
+        self._record(time.monotonic() - start)
+        return True
+
+    async def aacquire(self, *, blocking: bool = True) -> bool:
+        if not self._turns and self._wait() == 0:
+            self.requests.take(1)
+            self._record(0.0)
+            return True
+        if not blocking:
+            return False
+        start = time.monotonic()
+        run_id = current_run_id()
+        waiter = asyncio.get_running_loop().create_future()
+        if run_id not in self._waiting:
+            self._waiting[run_id] = deque()
+            self._turns.append(run_id)
+        self._waiting[run_id].append(waiter)
+        if self._dispatcher is None or self._dispatcher.done():
+            self._dispatcher = asyncio.create_task(self._dispatch())
+        await waiter
+        waited = time.monotonic() - start
+        self._record(waited)
+        record_queue_wait(waited)
+        return True
+
+
+class _TokenUsageCallback(AsyncCallbackHandler):
+    run_inline = True
+
+    def __init__(self, limiter: TokenBucketRateLimiter):
+        self.limiter = limiter
+
+    async def on_llm_end(self, response, *, run_id, **kwargs):
+        for generations in response.generations:
+            for generation in generations:
+                usage = getattr(
+                    getattr(generation, "message", None), "usage_metadata", None
+                )
+                if usage:
+                    self.limiter.add_tokens(usage.get("total_tokens", 0))
+
+
+class ModelPool:
+    """
+    Chat models shared by every fill in the process. A model is built once per
+    class and settings (and event loop, the HTTP clients are bound to one), so
+    concurrent runs reuse its connections. Every model name gets its own
+    TokenBucketRateLimiter with requests_per_minute and tokens_per_minute, shared by
+    all runs using that model; without either, calls are not limited.
+    """
+
+    def __init__(
+        self,
+        requests_per_minute: float | None = None,
+        tokens_per_minute: float | None = None,
+    ):
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self.limiters: dict[str, TokenBucketRateLimiter] = {}
+        self._models: weakref.WeakKeyDictionary = weakref.WeakKeyDictionary()
+
+    def get(self, model_class: type[BaseChatModel], model: str, **settings):
+        """
+        The pooled model_class(model=model, **settings), with timing callbacks and
+        the rate limiter of the model name attached.
+        """
+        key = (
+            model_class,
+            model,
+            tuple(
+                sorted(
+                    (name, value if isinstance(value, (str, int, float)) else id(value))
+                    for name, value in settings.items()
+                )
+            ),
+        )
+        models = self._models.setdefault(asyncio.get_running_loop(), {})
+        if key not in models:
+            callbacks = [LLM_TIMING_CALLBACK]
+            limiter = None
+            if self.requests_per_minute or self.tokens_per_minute:
+                if model not in self.limiters:
+                    self.limiters[model] = TokenBucketRateLimiter(
+                        self.requests_per_minute, self.tokens_per_minute
+                    )
+                limiter = self.limiters[model]
+                callbacks.append(_TokenUsageCallback(limiter))
+            models[key] = model_class(
+                model=model, callbacks=callbacks, rate_limiter=limiter, **settings
+            )
+        return models[key]
+
+    def stats(self) -> dict[str, dict]:
+        """
+        Requests granted and seconds spent waiting for them, per model name.
+        """
+        return {
+            model: {
+                "requests": limiter.granted,
+                "queue_seconds": limiter.queue_seconds,
+                "max_queue_seconds": limiter.max_queue_seconds,
+            }
+            for model, limiter in self.limiters.items()
+        }
+
+
+# Unlimited, it only shares connections; pass a ModelPool with limits instead
+DEFAULT_MODEL_POOL = ModelPool()
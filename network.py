@@ -0,0 +1,118 @@
+import base64
+import hashlib
+import json
+import os
+from pathlib import Path
+
+from browser_use.browser.context import BrowserContext
+from playwright.async_api import Error as PlaywrightError
+from playwright.async_api import Route
+
+# Nothing a fill reads or writes, only what the page looks like
+DEFAULT_BLOCKED_RESOURCES = frozenset({"image", "media", "font"})
+
+# Bodies are stored decoded, the encoding headers of the original would be wrong
+_DROPPED_HEADERS = {"content-encoding", "content-length", "transfer-encoding"}
+
+
+class PageSnapshots:
+    """
+    Responses to GET requests kept on local disk, one file per URL. The first run
+    against a page records the document and everything it loads, later runs are
+    served from the files without touching the network.
+    """
+
+    def __init__(self, snapshot_dir: str):
+        self.snapshot_dir = Path(snapshot_dir)
+        self.snapshot_dir.mkdir(parents=True, exist_ok=True)
+
+    def _path(self, url: str) -> Path:
+        digest = hashlib.sha1(url.encode()).hexdigest()
+        return self.snapshot_dir / f"{digest}.json"
+
+    def load(self, url: str) -> dict | None:
+        try:
+            snapshot = json.loads(self._path(url).read_text())
+        except (OSError, ValueError):
+            return None
+        snapshot["body"] = base64.b64decode(snapshot["body"])
+        return snapshot
+
+    def save(self, url: str, status: int, headers: dict, body: bytes):
+        path = self._path(url)
+        temporary_path = path.with_suffix(f".{os.getpid()}.tmp")
+        temporary_path.write_text(
+            json.dumps(
+                {
+                    "url": url,
+                    "status": status,
+                    "headers": headers,
+                    "body": base64.b64encode(body).decode(),
+                }
+            )
+        )
+        # Atomic, concurrent runs never read half a snapshot
+        temporary_path.replace(path)
+
+    async def serve(self, route: Route):
+        url = route.request.url
+        snapshot = self.load(url)
+        if snapshot is None:
+            try:
+                response = await route.fetch()
+                body = await response.body()
+            except PlaywrightError as e:
+                print(f"Failed to snapshot {url}: {e}")
+                await route.abort("failed")
+                return
+            # Errors are served this time but not kept, the next run tries again
+            if response.status < 400:
+                self.save(url, response.status, response.headers, body)
+            snapshot = {"status": response.status, "headers": response.headers}
+            snapshot["body"] = body
+        headers = {
+            name: value
+            for name, value in snapshot["headers"].items()
+            if name.lower() not in _DROPPED_HEADERS
+        }
+        await route.fulfill(
+            status=snapshot["status"], headers=headers, body=snapshot["body"]
+        )
+
+
+class RequestRouter:
+    """
+    Intercepts the requests of a browser context before they reach the network.
+    Requests for block_resources types (Playwright resource types, e.g.
+    DEFAULT_BLOCKED_RESOURCES) are aborted, and with snapshot_dir every other GET
+    is served from PageSnapshots there, recorded on first use.
+    """
+
+    def __init__(
+        self,
+        block_resources: frozenset[str] = frozenset(),
+        snapshot_dir: str | None = None,
+    ):
+        self.block_resources = frozenset(block_resources)
+        self.snapshots = PageSnapshots(snapshot_dir) if snapshot_dir else None
+
+    async def _handle(self, route: Route):
+        request = route.request
+        if request.resource_type in self.block_resources:
+            await route.abort("blockedbyclient")
+        elif (
+            self.snapshots is not None
+            and request.method == "GET"
+            and request.url.startswith(("http://", "https://"))
+        ):
+            await self.snapshots.serve(route)
+        else:
+            await route.continue_()
+
+    async def route_context(self, context: BrowserContext):
+        """
+        Route every request of the context through this router, before it
+        navigates anywhere.
+        """
+        session = await context.get_session()
+        await session.context.route("**/*", self._handle)
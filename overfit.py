@@ -1,226 +1,465 @@
-def generate_overfitted_form_instructions(data: dict) -> str:
-    """
-    this is very overfit to the mock_data, but changing this if the form/json-schema
-    changes should be straightforward. the regidity of this prompt engineering
-    approach makes it more robust than more open ended approaches. ideally, the
-    creation of these sort of prompts would be done automatically in some sort of
-    RL gym environment.
-    """
-    # Attorney Information
-    ATTORNEY_ONLINE_ACCOUNT_NUMBER = data["attorney"]["online_account_number"]
-    ATTORNEY_FAMILY_NAME = data["attorney"]["family_name"]
-    ATTORNEY_FIRST_NAME = data["attorney"]["first_name"]
-    ATTORNEY_MIDDLE_NAME = data["attorney"]["middle_name"]
-    ATTORNEY_ADDRESS_LINE_1 = data["attorney"]["address_line_1"]
-    ATTORNEY_UNIT_TYPE = data["attorney"]["unit_type"]
-    ATTORNEY_ADDRESS_LINE_2 = data["attorney"]["address_line_2"]
-    ATTORNEY_CITY = data["attorney"]["city"]
-    ATTORNEY_STATE = data["attorney"]["state"]
-    ATTORNEY_ZIP_CODE = data["attorney"]["zip_code"]
-    ATTORNEY_PROVINCE = data["attorney"]["province"]
-    ATTORNEY_COUNTRY = data["attorney"]["country"]
-    ATTORNEY_DAYTIME_PHONE = data["attorney"]["daytime_phone"]
-    ATTORNEY_EMAIL = data["attorney"]["email"]
-    ATTORNEY_FAX = data["attorney"]["fax"]
-    ATTORNEY_ELIGIBLE = data["attorney"]["attorney_eligible"]
-    ATTORNEY_LICENSING_STATE = data["attorney"]["licensing_state"]
-    ATTORNEY_BAR_NUMBER = data["attorney"]["bar_number"]
-    ATTORNEY_SUBJECT_TO_RESTRICTIONS = data["attorney"][
-        "subject_to_restrictions"
-    ]  # "no"
-    ATTORNEY_LAW_FIRM = data["attorney"]["law_firm"]
-    ATTORNEY_IS_NONPROFIT_REP = data["attorney"]["is_nonprofit_rep"]
-    ATTORNEY_ORG_NAME = data["attorney"]["org_name"]
-    ATTORNEY_ACCREDITATION_DATE = data["attorney"]["accreditation_date"]
-    ATTORNEY_ASSOCIATED_WITH_STUDENT = data["attorney"][
-        "associated_with_student"
-    ]  # "no"
-    ATTORNEY_LAW_STUDENT = data["attorney"]["law_student"]
-    ATTORNEY_ADMINISTRATIVE_CASE = data["attorney"]["administrative_case"]
-    ATTORNEY_ADMINISTRATIVE_MATTER = data["attorney"]["administrative_matter"]
-    ATTORNEY_CIVIL_CASE = data["attorney"]["civil_case"]
-    ATTORNEY_CIVIL_MATTER = data["attorney"]["civil_matter"]
-    ATTORNEY_OTHER_LEGAL = data["attorney"]["other_legal"]
-    ATTORNEY_OTHER_LEGAL_MATTER = data["attorney"]["other_legal_matter"]
-    ATTORNEY_RECEIPT_NUMBER = data["attorney"]["receipt_number"]
-    ATTORNEY_CLIENT_TYPE = data["attorney"]["client_type"]
-
-    # Client Information
-    CLIENT_FAMILY_NAME = data["client"]["family_name"]
-    CLIENT_FIRST_NAME = data["client"]["first_name"]
-    CLIENT_ENTITY_NAME = data["client"]["entity_name"]
-    CLIENT_ENTITY_TITLE = data["client"]["entity_title"]
-    CLIENT_REFERENCE_NUMBER = data["client"]["reference_number"]
-    CLIENT_ID_NUMBER = data["client"]["id_number"]
-    CLIENT_DAYTIME_PHONE = data["client"]["daytime_phone"]
-    CLIENT_MOBILE_PHONE = data["client"]["mobile_phone"]
-    CLIENT_EMAIL = data["client"]["email"]
-    CLIENT_ADDRESS_LINE_1 = data["client"]["address_line_1"]
-    CLIENT_UNIT_TYPE = data["client"]["unit_type"]
-    CLIENT_ADDRESS_LINE_2 = data["client"]["address_line_2"]
-    CLIENT_CITY = data["client"]["city"]
-    CLIENT_STATE = data["client"]["state"]
-    CLIENT_ZIP_CODE = data["client"]["zip_code"]
-    CLIENT_PROVINCE = data["client"]["province"]
-    CLIENT_COUNTRY = data["client"]["country"]
-    CLIENT_SEND_NOTICES_TO_ATTORNEY = data["client"]["send_notices_to_attorney"]
-    CLIENT_SEND_DOCUMENTS_TO_ATTORNEY = data["client"]["send_documents_to_attorney"]
-    CLIENT_SEND_DOCUMENTS_TO_CLIENT = data["client"]["send_documents_to_client"]
-    CLIENT_SIGNATURE_DATE = data["client"]["signature_date"]
-
-    # Top Level Signature Dates
-    ATTORNEY_SIGNATURE_DATE = data["attorney_signature_date"]
-    ADDITIONAL_SIGNATURE_DATE = data["additional_signature_date"]
-
-    # Part 6 Additional Information (assuming only one entry for this overfitted example)
-    ADDITIONAL_INFO_FAMILY_NAME = data["part6"]["additional_info"]["family_name"]
-    ADDITIONAL_INFO_GIVEN_NAME = data["part6"]["additional_info"]["given_name"]
-    ADDITIONAL_INFO_MIDDLE_NAME = data["part6"]["additional_info"]["middle_name"]
-    # Handle the list - assuming exactly one entry as per mock_data
-    if data["part6"]["additional_info"]["entries"]:
-        ADDITIONAL_INFO_ENTRY_0_PAGE_NUMBER = data["part6"]["additional_info"][
-            "entries"
-        ][0]["page_number"]
-        ADDITIONAL_INFO_ENTRY_0_PART_NUMBER = data["part6"]["additional_info"][
-            "entries"
-        ][0]["part_number"]
-        ADDITIONAL_INFO_ENTRY_0_ITEM_NUMBER = data["part6"]["additional_info"][
-            "entries"
-        ][0]["item_number"]
-        ADDITIONAL_INFO_ENTRY_0_ADDITIONAL_INFO = data["part6"]["additional_info"][
-            "entries"
-        ][0]["additional_info"]
-    else:  # Basic fallback if the list is unexpectedly empty
-        ADDITIONAL_INFO_ENTRY_0_PAGE_NUMBER = "[Data Not Provided]"
-        ADDITIONAL_INFO_ENTRY_0_PART_NUMBER = "[Data Not Provided]"
-        ADDITIONAL_INFO_ENTRY_0_ITEM_NUMBER = "[Data Not Provided]"
-        ADDITIONAL_INFO_ENTRY_0_ADDITIONAL_INFO = "[Data Not Provided]"
-
-    instructions = f"""
-Please fill out the Form A-28 (Notice of Entry of Appearance as Attorney or Representative) precisely according to the following details. Use the exact values provided and locate fields based on their numbers and labels as shown below.
-
-You should NOT sign the form as a representative of any entity.
-
-**Part 1. Information About Attorney or Representative**
+import functools
+import string
 
-1. Online Account Number (if any): Enter `{ATTORNEY_ONLINE_ACCOUNT_NUMBER}` into field 1.
+from pydantic import BaseModel
 
-Name of Attorney or Representative:
-2.a. Family Name (Last Name): Enter `{ATTORNEY_FAMILY_NAME}`.
-2.b. Given Name (First Name): Enter `{ATTORNEY_FIRST_NAME}`.
-2.c. Middle Name: Enter `{ATTORNEY_MIDDLE_NAME}`.
+LEAVE_BLANK = "[Leave Blank]"
 
-Address of Attorney or Representative:
-3.a. Street Number and Name: Enter `{ATTORNEY_ADDRESS_LINE_1}`.
-3.b. Unit Type: Select the appropriate checkbox (`Apt.`, `Ste.`, or `Flr.`) based on value `{ATTORNEY_UNIT_TYPE if ATTORNEY_UNIT_TYPE else "[Leave Blank]"}`.
-   - Enter the unit number `{ATTORNEY_ADDRESS_LINE_2 if ATTORNEY_ADDRESS_LINE_2 else "[Leave Blank]"}` in the field to the right of the checkboxes.
-3.c. City or Town: Enter `{ATTORNEY_CITY}`.
-3.d. State: Select `{ATTORNEY_STATE}` from the dropdown.
-3.e. ZIP Code: Enter `{ATTORNEY_ZIP_CODE}`.
-3.f. Province: Enter `{ATTORNEY_PROVINCE if ATTORNEY_PROVINCE else "[Leave Blank]"}`.
-3.g. Postal Code: Enter `{ATTORNEY_ZIP_CODE}`.
-3.h. Country: Enter `{ATTORNEY_COUNTRY}`.
 
-Contact Information of Attorney or Representative:
-4. Daytime Telephone Number: Enter `{ATTORNEY_DAYTIME_PHONE}`.
-5. Mobile Telephone Number (if any): Leave blank as this is not specified in the data.
-6. Email Address (if any): Enter `{ATTORNEY_EMAIL}`.
-7. Fax Number (if any): Enter `{ATTORNEY_FAX if ATTORNEY_FAX else "[Leave Blank]"}`.
+class TemplateField(BaseModel, frozen=True):
+    """
+    One line of the template that shows a value of the record. Rendered as
+    "{item} {label}: {text}", or just text without a label. text may refer to
+    {value}, the leaf at path (relative to the entry inside a TemplateRepeat).
+    """
 
-**Part 2. Eligibility Information for Attorney or Representative**
+    path: tuple[str, ...]
+    item: str = ""  # the item number on the form, "{n}" is the entry's number
+    label: str = ""
+    text: str = "Enter `{value}`."
+    blank: str | None = None  # shown instead of an empty value
+    only_if: str | None = None  # sibling key that must be set for the line to apply
+    otherwise: str = "Leave blank based on the above."  # text when it does not
 
-For item 1.a, check the box that says "I am an attorney eligible to practice law in, and a member in good standing of, the bar of the highest courts of the following jurisdictions." based on value `{ATTORNEY_ELIGIBLE}`.
 
-Licensing Authority: Enter `{ATTORNEY_LICENSING_STATE}` in the field below "Licensing Authority".
-1.b. Bar Number (if applicable): Enter `{ATTORNEY_BAR_NUMBER}`.
+class TemplateRepeat(BaseModel, frozen=True):
+    """
+    Lines rendered once per entry of the list at path, the entries numbered from
+    first_item on.
+    """
 
-1.c. Select only one box:
-- Check "am not" for "I am not subject to any order suspending, enjoining, restraining, disbarring, or otherwise restricting me in the practice of law" based on the value `{ATTORNEY_SUBJECT_TO_RESTRICTIONS}`.
+    path: tuple[str, ...]
+    lines: tuple[TemplateField, ...]
+    first_item: int = 1
 
-1.d. Name of Law Firm or Organization (if applicable): Enter `{ATTORNEY_LAW_FIRM}`.
 
-For item 2.a, do NOT check the box related to nonprofit organization representation based on value `{ATTORNEY_IS_NONPROFIT_REP}`.
-2.b. Name of Recognized Organization: Leave blank based on the above.
-2.c. Date of Accreditation: Leave blank based on the above.
+# The A-28 in form order. Plain strings are copied as they are.
+A28_TEMPLATE = (
+    """
+Please fill out the Form A-28 (Notice of Entry of Appearance as Attorney or Representative) precisely according to the following details. Use the exact values provided and locate fields based on their numbers and labels as shown below.
 
-For item 3, do NOT check the box that says "I am associated with..." based on value `{ATTORNEY_ASSOCIATED_WITH_STUDENT}`.
+You should NOT sign the form as a representative of any entity.
 
-For item 4.a, do NOT check the box related to being a law student based on the above.
-4.b. Name of Law Student or Law Graduate: Leave blank based on the above.
+**Part 1. Information About Attorney or Representative**
 
+""",
+    TemplateField(
+        path=("attorney", "online_account_number"),
+        item="1.",
+        label="Online Account Number (if any)",
+        text="Enter `{value}` into field 1.",
+    ),
+    "\nName of Attorney or Representative:\n",
+    TemplateField(
+        path=("attorney", "family_name"), item="2.a.", label="Family Name (Last Name)"
+    ),
+    TemplateField(
+        path=("attorney", "first_name"), item="2.b.", label="Given Name (First Name)"
+    ),
+    TemplateField(path=("attorney", "middle_name"), item="2.c.", label="Middle Name"),
+    "\nAddress of Attorney or Representative:\n",
+    TemplateField(
+        path=("attorney", "address_line_1"),
+        item="3.a.",
+        label="Street Number and Name",
+    ),
+    TemplateField(
+        path=("attorney", "unit_type"),
+        item="3.b.",
+        label="Unit Type",
+        text="Select the appropriate checkbox (`Apt.`, `Ste.`, or `Flr.`) based on value `{value}`.",
+        blank=LEAVE_BLANK,
+    ),
+    TemplateField(
+        path=("attorney", "address_line_2"),
+        text="   - Enter the unit number `{value}` in the field to the right of the checkboxes.",
+        blank=LEAVE_BLANK,
+    ),
+    TemplateField(path=("attorney", "city"), item="3.c.", label="City or Town"),
+    TemplateField(
+        path=("attorney", "state"),
+        item="3.d.",
+        label="State",
+        text="Select `{value}` from the dropdown.",
+    ),
+    TemplateField(path=("attorney", "zip_code"), item="3.e.", label="ZIP Code"),
+    TemplateField(
+        path=("attorney", "province"), item="3.f.", label="Province", blank=LEAVE_BLANK
+    ),
+    TemplateField(path=("attorney", "zip_code"), item="3.g.", label="Postal Code"),
+    TemplateField(path=("attorney", "country"), item="3.h.", label="Country"),
+    "\nContact Information of Attorney or Representative:\n",
+    TemplateField(
+        path=("attorney", "daytime_phone"), item="4.", label="Daytime Telephone Number"
+    ),
+    "5. Mobile Telephone Number (if any): Leave blank as this is not specified in the data.\n",
+    TemplateField(
+        path=("attorney", "email"), item="6.", label="Email Address (if any)"
+    ),
+    TemplateField(
+        path=("attorney", "fax"),
+        item="7.",
+        label="Fax Number (if any)",
+        blank=LEAVE_BLANK,
+    ),
+    "\n**Part 2. Eligibility Information for Attorney or Representative**\n\n",
+    TemplateField(
+        path=("attorney", "attorney_eligible"),
+        text='For item 1.a, check the box that says "I am an attorney eligible to practice law in, and a member in good standing of, the bar of the highest courts of the following jurisdictions." based on value `{value}`.',
+    ),
+    "\n",
+    TemplateField(
+        path=("attorney", "licensing_state"),
+        label="Licensing Authority",
+        text='Enter `{value}` in the field below "Licensing Authority".',
+    ),
+    TemplateField(
+        path=("attorney", "bar_number"),
+        item="1.b.",
+        label="Bar Number (if applicable)",
+    ),
+    "\n1.c. Select only one box:\n",
+    TemplateField(
+        path=("attorney", "subject_to_restrictions"),
+        text='- Check "am not" for "I am not subject to any order suspending, enjoining, restraining, disbarring, or otherwise restricting me in the practice of law" based on the value `{value}`.',
+    ),
+    "\n",
+    TemplateField(
+        path=("attorney", "law_firm"),
+        item="1.d.",
+        label="Name of Law Firm or Organization (if applicable)",
+    ),
+    "\n",
+    TemplateField(
+        path=("attorney", "is_nonprofit_rep"),
+        text="For item 2.a, check the box related to nonprofit organization representation based on value `{value}`.",
+        only_if="is_nonprofit_rep",
+        otherwise="For item 2.a, do NOT check the box related to nonprofit organization representation based on value `{value}`.",
+    ),
+    TemplateField(
+        path=("attorney", "org_name"),
+        item="2.b.",
+        label="Name of Recognized Organization",
+        blank=LEAVE_BLANK,
+        only_if="is_nonprofit_rep",
+    ),
+    TemplateField(
+        path=("attorney", "accreditation_date"),
+        item="2.c.",
+        label="Date of Accreditation",
+        blank=LEAVE_BLANK,
+        only_if="is_nonprofit_rep",
+    ),
+    "\n",
+    TemplateField(
+        path=("attorney", "associated_with_student"),
+        text='For item 3, check the box that says "I am associated with..." based on value `{value}`.',
+        only_if="associated_with_student",
+        otherwise='For item 3, do NOT check the box that says "I am associated with..." based on value `{value}`.',
+    ),
+    "\nFor item 4.a, do NOT check the box related to being a law student based on the above.\n",
+    TemplateField(
+        path=("attorney", "law_student"),
+        item="4.b.",
+        label="Name of Law Student or Law Graduate",
+        blank=LEAVE_BLANK,
+        only_if="associated_with_student",
+    ),
+    """
 **Part 3. Notice of Appearance as Attorney or Representative**
 
 This appearance relates to matters before (select applicable option):
-- If `{ATTORNEY_ADMINISTRATIVE_CASE}` is True, check box 1.a. "Administrative Case"
-  In field 1.b, enter the specific matter: `{ATTORNEY_ADMINISTRATIVE_MATTER}`.
-- If `{ATTORNEY_CIVIL_CASE}` is True, check box 2.a. "Civil Case"
-  Otherwise, leave unchecked.
-  Field 2.b: Leave blank or enter `{ATTORNEY_CIVIL_MATTER if ATTORNEY_CIVIL_MATTER else "[Leave Blank]"}`.
-- If `{ATTORNEY_OTHER_LEGAL}` is True, check box 3.a. "Other Legal Matter"
-  Otherwise, leave unchecked.
-  Field 3.b: Leave blank or enter `{ATTORNEY_OTHER_LEGAL_MATTER if ATTORNEY_OTHER_LEGAL_MATTER else "[Leave Blank]"}`.
-
-4. Receipt Number (if any): Enter `{ATTORNEY_RECEIPT_NUMBER}`.
-
-5. I enter my appearance as an attorney or accredited representative at the request of the (select only one box):
-- Check the appropriate box that corresponds to `{ATTORNEY_CLIENT_TYPE}` (Applicant, Petitioner, Requestor, Beneficiary/Derivative, or Respondent).
-
-Information About Client:
-6.a. Family Name (Last Name): Enter `{CLIENT_FAMILY_NAME}`.
-6.b. Given Name (First Name): Enter `{CLIENT_FIRST_NAME}`.
-6.c. Middle Name: Leave blank (not provided in data).
-7.a. Name of Entity (if applicable): Enter `{CLIENT_ENTITY_NAME if CLIENT_ENTITY_NAME else "[Leave Blank]"}`.
-7.b. Title of Authorized Signatory for Entity (if applicable): Enter `{CLIENT_ENTITY_TITLE if CLIENT_ENTITY_TITLE else "[Leave Blank]"}`.
-8. Client's Reference Number (if any): Enter `{CLIENT_REFERENCE_NUMBER if CLIENT_REFERENCE_NUMBER else "[Leave Blank]"}`.
-9. Client's ID Number (if any): Enter `{CLIENT_ID_NUMBER}`.
-
-Client's Contact Information:
-10. Daytime Telephone Number: Enter `{CLIENT_DAYTIME_PHONE}`.
-11. Mobile Telephone Number (if any): Enter `{CLIENT_MOBILE_PHONE if CLIENT_MOBILE_PHONE else "[Leave Blank]"}`.
-12. Email Address (if any): Enter `{CLIENT_EMAIL}`.
-
-Mailing Address of Client:
-13.a. Street Number and Name: Enter `{CLIENT_ADDRESS_LINE_1}`.
-13.b. Unit Type: Select the appropriate checkbox (Apt., Ste., or Flr.) based on `{CLIENT_UNIT_TYPE if CLIENT_UNIT_TYPE else "[Leave Blank]"}`.
-    - Enter the unit number `{CLIENT_ADDRESS_LINE_2 if CLIENT_ADDRESS_LINE_2 else "[Leave Blank]"}` in the field to the right of the checkboxes.
-13.c. City or Town: Enter `{CLIENT_CITY}`.
-13.d. State: Select `{CLIENT_STATE}` from the dropdown.
-13.e. ZIP Code: Enter `{CLIENT_ZIP_CODE}`.
-13.f. Province: Enter `{CLIENT_PROVINCE if CLIENT_PROVINCE else "[Leave Blank]"}`.
-13.g. Postal Code: Enter `{CLIENT_ZIP_CODE}`.
-13.h. Country: Enter `{CLIENT_COUNTRY}`.
-
+""",
+    TemplateField(
+        path=("attorney", "administrative_case"),
+        text='- If `{value}` is True, check box 1.a. "Administrative Case"',
+    ),
+    TemplateField(
+        path=("attorney", "administrative_matter"),
+        text="  In field 1.b, enter the specific matter: `{value}`.",
+    ),
+    TemplateField(
+        path=("attorney", "civil_case"),
+        text='- If `{value}` is True, check box 2.a. "Civil Case"',
+    ),
+    "  Otherwise, leave unchecked.\n",
+    TemplateField(
+        path=("attorney", "civil_matter"),
+        text="  Field 2.b: Leave blank or enter `{value}`.",
+        blank=LEAVE_BLANK,
+    ),
+    TemplateField(
+        path=("attorney", "other_legal"),
+        text='- If `{value}` is True, check box 3.a. "Other Legal Matter"',
+    ),
+    "  Otherwise, leave unchecked.\n",
+    TemplateField(
+        path=("attorney", "other_legal_matter"),
+        text="  Field 3.b: Leave blank or enter `{value}`.",
+        blank=LEAVE_BLANK,
+    ),
+    "\n",
+    TemplateField(
+        path=("attorney", "receipt_number"), item="4.", label="Receipt Number (if any)"
+    ),
+    "\n5. I enter my appearance as an attorney or accredited representative at the request of the (select only one box):\n",
+    TemplateField(
+        path=("attorney", "client_type"),
+        text="- Check the appropriate box that corresponds to `{value}` (Applicant, Petitioner, Requestor, Beneficiary/Derivative, or Respondent).",
+    ),
+    "\nInformation About Client:\n",
+    TemplateField(
+        path=("client", "family_name"), item="6.a.", label="Family Name (Last Name)"
+    ),
+    TemplateField(
+        path=("client", "first_name"), item="6.b.", label="Given Name (First Name)"
+    ),
+    "6.c. Middle Name: Leave blank (not provided in data).\n",
+    TemplateField(
+        path=("client", "entity_name"),
+        item="7.a.",
+        label="Name of Entity (if applicable)",
+        blank=LEAVE_BLANK,
+    ),
+    TemplateField(
+        path=("client", "entity_title"),
+        item="7.b.",
+        label="Title of Authorized Signatory for Entity (if applicable)",
+        blank=LEAVE_BLANK,
+    ),
+    TemplateField(
+        path=("client", "reference_number"),
+        item="8.",
+        label="Client's Reference Number (if any)",
+        blank=LEAVE_BLANK,
+    ),
+    TemplateField(
+        path=("client", "id_number"), item="9.", label="Client's ID Number (if any)"
+    ),
+    "\nClient's Contact Information:\n",
+    TemplateField(
+        path=("client", "daytime_phone"), item="10.", label="Daytime Telephone Number"
+    ),
+    TemplateField(
+        path=("client", "mobile_phone"),
+        item="11.",
+        label="Mobile Telephone Number (if any)",
+        blank=LEAVE_BLANK,
+    ),
+    TemplateField(path=("client", "email"), item="12.", label="Email Address (if any)"),
+    "\nMailing Address of Client:\n",
+    TemplateField(
+        path=("client", "address_line_1"), item="13.a.", label="Street Number and Name"
+    ),
+    TemplateField(
+        path=("client", "unit_type"),
+        item="13.b.",
+        label="Unit Type",
+        text="Select the appropriate checkbox (Apt., Ste., or Flr.) based on `{value}`.",
+        blank=LEAVE_BLANK,
+    ),
+    TemplateField(
+        path=("client", "address_line_2"),
+        text="    - Enter the unit number `{value}` in the field to the right of the checkboxes.",
+        blank=LEAVE_BLANK,
+    ),
+    TemplateField(path=("client", "city"), item="13.c.", label="City or Town"),
+    TemplateField(
+        path=("client", "state"),
+        item="13.d.",
+        label="State",
+        text="Select `{value}` from the dropdown.",
+    ),
+    TemplateField(path=("client", "zip_code"), item="13.e.", label="ZIP Code"),
+    TemplateField(
+        path=("client", "province"), item="13.f.", label="Province", blank=LEAVE_BLANK
+    ),
+    TemplateField(path=("client", "zip_code"), item="13.g.", label="Postal Code"),
+    TemplateField(path=("client", "country"), item="13.h.", label="Country"),
+    """
 **Part 4. Client's Consent to Representation and Signature**
 
 For the checkboxes under "Options Regarding Receipt of Notices and Documents":
-- If `{CLIENT_SEND_NOTICES_TO_ATTORNEY}` is "Y", check box 1.a. "I request that all original notices on an application or petition be sent to the business address of my attorney or representative."
-- If `{CLIENT_SEND_DOCUMENTS_TO_ATTORNEY}` is "Y", check box 1.b. "I request that any important documents that I receive be sent to the business address of my attorney or representative."
-- If `{CLIENT_SEND_DOCUMENTS_TO_CLIENT}` is "Y", check box 1.c. "I request that important documentation be sent to me at my mailing address." Otherwise, leave unchecked.
+""",
+    TemplateField(
+        path=("client", "send_notices_to_attorney"),
+        text='- If `{value}` is "Y", check box 1.a. "I request that all original notices on an application or petition be sent to the business address of my attorney or representative."',
+    ),
+    TemplateField(
+        path=("client", "send_documents_to_attorney"),
+        text='- If `{value}` is "Y", check box 1.b. "I request that any important documents that I receive be sent to the business address of my attorney or representative."',
+    ),
+    TemplateField(
+        path=("client", "send_documents_to_client"),
+        text='- If `{value}` is "Y", check box 1.c. "I request that important documentation be sent to me at my mailing address." Otherwise, leave unchecked.',
+    ),
+    "\n",
+    TemplateField(
+        path=("client", "signature_date"),
+        item="2.b.",
+        label="Date of Signature (mm/dd/yyyy)",
+        blank=LEAVE_BLANK,
+    ),
+    "\n**Part 5. Signature of Attorney or Representative**\n\n",
+    TemplateField(
+        path=("attorney_signature_date",),
+        item="1.b.",
+        label="Date of Signature (mm/dd/yyyy)",
+        blank=LEAVE_BLANK,
+    ),
+    TemplateField(
+        path=("additional_signature_date",),
+        item="2.b.",
+        label="Date of Signature (mm/dd/yyyy)",
+        blank=LEAVE_BLANK,
+    ),
+    "\n**Part 6. Additional Information**\n\n",
+    TemplateField(
+        path=("part6", "additional_info", "family_name"),
+        item="1.a.",
+        label="Family Name (Last Name)",
+    ),
+    TemplateField(
+        path=("part6", "additional_info", "given_name"),
+        item="1.b.",
+        label="Given Name (First Name)",
+    ),
+    TemplateField(
+        path=("part6", "additional_info", "middle_name"),
+        item="1.c.",
+        label="Middle Name",
+    ),
+    "\nIn the additional information section:\n",
+    TemplateRepeat(
+        path=("part6", "additional_info", "entries"),
+        first_item=2,
+        lines=(
+            TemplateField(path=("page_number",), item="{n}.a.", label="Page Number"),
+            TemplateField(path=("part_number",), item="{n}.b.", label="Part Number"),
+            TemplateField(path=("item_number",), item="{n}.c.", label="Item Number"),
+            TemplateField(
+                path=("additional_info",),
+                text='- In the large text field below these entries, enter: "{value}"\n',
+            ),
+        ),
+    ),
+    """Ensure all fields are completed exactly as specified. If a value is indicated as '[Leave Blank]', ensure the corresponding field is left empty. Double-check all entries before submitting.
+""",
+)
+
+
+def _is_set(value) -> bool:
+    return bool(value) and str(value).strip().lower() not in ("no", "n", "false")
+
+
+def _blank(value, blank: str):
+    return blank if value in ("", None) else value
+
+
+def _lookup(path):
+    def lookup(data):
+        for key in path:
+            data = data[key]
+        return data
+
+    return lookup
+
+
+def _value(field: TemplateField):
+    lookup = _lookup(field.path)
+    if field.blank is None:
+        return lambda data, n: str(lookup(data))
+    return lambda data, n: str(_blank(lookup(data), field.blank))
+
+
+def _entry_number(data, n):
+    return str(n)
+
+
+def _segments(part) -> list:
+    """
+    A part as strings and functions of (data, n) returning strings, in order.
+    """
+    if isinstance(part, str):
+        return [part]
+    if isinstance(part, TemplateRepeat):
+        return [_repeat(part)]
+    if part.only_if is not None:
+        return [_conditional(part)]
+    prefix = " ".join(piece for piece in (part.item, part.label) if piece)
+    prefix = f"{prefix}: " if part.label else ""
+    segments = []
+    for literal, name, _, _ in string.Formatter().parse(prefix + part.text + "\n"):
+        segments.append(literal)
+        if name is not None:
+            segments.append(_value(part) if name == "value" else _entry_number)
+    return segments
+
+
+def _compile(parts):
+    """
+    A renderer of parts built once: the text between values merged into constant
+    strings and a function per value looking it up, so rendering a record only
+    calls those and joins the pieces.
+    """
+    pieces = []
+    for part in parts:
+        for segment in _segments(part):
+            if isinstance(segment, str) and pieces and isinstance(pieces[-1], str):
+                pieces[-1] += segment
+            else:
+                pieces.append(segment)
+    pieces = tuple(pieces)
+
+    def render(data: dict, n: int) -> str:
+        return "".join(
+            [piece if isinstance(piece, str) else piece(data, n) for piece in pieces]
+        )
+
+    return render
 
-2.b. Date of Signature (mm/dd/yyyy): Enter `{CLIENT_SIGNATURE_DATE if CLIENT_SIGNATURE_DATE else "[Leave Blank]"}`.
 
-**Part 5. Signature of Attorney or Representative**
+def _repeat(part: TemplateRepeat):
+    entry = _compile(part.lines)
+    entries = _lookup(part.path)
 
-1.b. Date of Signature (mm/dd/yyyy): Enter `{ATTORNEY_SIGNATURE_DATE if ATTORNEY_SIGNATURE_DATE else "[Leave Blank]"}`.
-2.b. Date of Signature (mm/dd/yyyy): Enter `{ADDITIONAL_SIGNATURE_DATE if ADDITIONAL_SIGNATURE_DATE else "[Leave Blank]"}`.
+    def render(data, n):
+        return "".join(
+            entry(item, number)
+            for number, item in enumerate(entries(data), part.first_item)
+        )
 
-**Part 6. Additional Information**
+    return render
 
-1.a. Family Name (Last Name): Enter `{ADDITIONAL_INFO_FAMILY_NAME}`.
-1.b. Given Name (First Name): Enter `{ADDITIONAL_INFO_GIVEN_NAME}`.
-1.c. Middle Name: Enter `{ADDITIONAL_INFO_MIDDLE_NAME}`.
 
-In the additional information section:
-2.a. Page Number: Enter `{ADDITIONAL_INFO_ENTRY_0_PAGE_NUMBER}`.
-2.b. Part Number: Enter `{ADDITIONAL_INFO_ENTRY_0_PART_NUMBER}`.
-2.c. Item Number: Enter `{ADDITIONAL_INFO_ENTRY_0_ITEM_NUMBER}`.
-- In the large text field below these entries, enter: "{ADDITIONAL_INFO_ENTRY_0_ADDITIONAL_INFO}"
+def _conditional(field: TemplateField):
+    applies = _compile((field.model_copy(update={"only_if": None}),))
+    otherwise = _compile(
+        (field.model_copy(update={"only_if": None, "text": field.otherwise}),)
+    )
+    controller = _lookup(field.path[:-1] + (field.only_if,))
 
-If you need to enter more additional information, use sections 3.a through 3.c in the same manner as above.
+    def render(data, n):
+        return (applies if _is_set(controller(data)) else otherwise)(data, n)
 
-Ensure all fields are completed exactly as specified. If a value is indicated as '[Leave Blank]', ensure the corresponding field is left empty. Double-check all entries before submitting.
-"""
-    return instructions
+    return render
+
+
+@functools.cache
+def _compiled_a28_template():
+    return _compile(A28_TEMPLATE)
+
+
+def generate_overfitted_form_instructions(data: dict) -> str:
+    """
+    this is very overfit to the mock_data, but changing this if the form/json-schema
+    changes should be straightforward: edit A28_TEMPLATE. the regidity of this prompt
+    engineering approach makes it more robust than more open ended approaches.
+    ideally, the creation of these sort of prompts would be done automatically in
+    some sort of RL gym environment. the template is compiled on first use, every
+    Part 6 entry gets its own numbered items.
+    """
+    return _compiled_a28_template()(data, 0)
 
 
 # --- Example Usage with the provided mock_data ---
@@ -0,0 +1,76 @@
+import asyncio
+
+from browser_use import Browser
+from browser_use.browser.context import BrowserContext
+
+from network import RequestRouter
+
+
+class WarmContextPool:
+    """
+    Browser contexts that are already sitting on base_url, so a fill can start
+    without paying for context creation and the page load. Every context handed
+    out is replaced in the background; the caller owns (and closes) it. With a
+    router, contexts load the page through it.
+    """
+
+    def __init__(
+        self,
+        browser: Browser,
+        base_url: str,
+        size: int = 2,
+        timeout: float = 60.0,
+        router: RequestRouter | None = None,
+    ):
+        self.browser = browser
+        self.router = router
+        self.base_url = base_url
+        self.size = size
+        self.timeout = timeout
+        self._ready: asyncio.Queue[BrowserContext] = asyncio.Queue()
+        self._warming: set[asyncio.Task] = set()
+
+    async def _warm(self):
+        context = await self.browser.new_context()
+        try:
+            if self.router is not None:
+                await self.router.route_context(context)
+            await asyncio.wait_for(
+                context.navigate_to(self.base_url), timeout=self.timeout
+            )
+        except Exception as e:
+            print(f"Failed to warm a context on {self.base_url}: {e}")
+            await context.close()
+            return
+        await self._ready.put(context)
+
+    def _schedule_warm(self):
+        task = asyncio.create_task(self._warm())
+        self._warming.add(task)
+        task.add_done_callback(self._warming.discard)
+
+    async def start(self):
+        for _ in range(self.size):
+            self._schedule_warm()
+
+    async def acquire(self) -> BrowserContext:
+        """
+        Take a context that is on base_url, waiting for one to finish loading if
+        none is ready yet.
+        """
+        self._schedule_warm()
+        return await asyncio.wait_for(self._ready.get(), timeout=self.timeout)
+
+    async def close(self):
+        for task in list(self._warming):
+            task.cancel()
+        await asyncio.gather(*self._warming, return_exceptions=True)
+        while not self._ready.empty():
+            await self._ready.get_nowait().close()
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.close()
@@ -0,0 +1,192 @@
+import hashlib
+import json
+from pathlib import Path
+
+from browser_use.agent.views import AgentHistoryList
+from playwright.async_api import Error as PlaywrightError
+from playwright.async_api import Page
+from pydantic import BaseModel
+
+from direct import as_checked, match_score, select_option_value
+
+REPLAY_ACTION_TIMEOUT_MS = 5000
+
+_READ_OPTIONS_JS = "el => Array.from(el.options).map((o) => [o.value, o.text.trim()])"
+
+
+class ReplayStep(BaseModel):
+    path: list[str]
+    action: str  # "fill", "select" or "check"
+    css_selector: str | None = None
+    xpath: str | None = None
+    value: str | bool | int | float | None = None  # value seen when recorded
+    # One option of a checkbox or radio group, e.g. client type or the yes/no of
+    # subject to restrictions, rather than a box of its own
+    group: bool = False
+
+
+def _script_file(base_url: str, replay_dir: str) -> Path:
+    digest = hashlib.sha1(base_url.encode()).hexdigest()[:16]
+    return Path(replay_dir) / f"{digest}.json"
+
+
+def load_replay_script(base_url: str, replay_dir: str) -> dict[tuple, ReplayStep]:
+    """
+    Load the replay script recorded for a form, keyed by JSON key path.
+    """
+    script_file = _script_file(base_url, replay_dir)
+    if not script_file.exists():
+        return {}
+    data = json.loads(script_file.read_text())
+    steps = [ReplayStep.model_validate(step) for step in data["steps"]]
+    return {tuple(step.path): step for step in steps}
+
+
+def save_replay_script(base_url: str, steps: list[ReplayStep], replay_dir: str):
+    """
+    Merge newly recorded steps into the replay script of a form. Steps recorded
+    later win over earlier ones for the same key path.
+    """
+    script = load_replay_script(base_url, replay_dir)
+    script.update({tuple(step.path): step for step in steps})
+    script_file = _script_file(base_url, replay_dir)
+    script_file.parent.mkdir(parents=True, exist_ok=True)
+    script_file.write_text(
+        json.dumps(
+            {
+                "base_url": base_url,
+                "steps": [step.model_dump() for step in script.values()],
+            },
+            indent=1,
+        )
+    )
+
+
+def compile_replay_steps(
+    agent_history_list: AgentHistoryList,
+    fields: list[tuple[tuple[str, ...], object]],
+) -> list[ReplayStep]:
+    """
+    Turn the actions an agent actually took into replay steps. Typed and selected
+    text is attributed to the leaf holding that value, clicked checkboxes to the
+    leaf whose key best matches the element's id/name/label. `fields` are the
+    leaves the agent was asked to fill, in order.
+    """
+    pending = list(fields)
+    steps = {}
+    for model_action in agent_history_list.model_actions():
+        element = model_action.pop("interacted_element", None)
+        if element is None or not model_action:
+            continue
+        action_name, params = next(iter(model_action.items()))
+        page_field = {
+            "id": element.attributes.get("id", ""),
+            "name": element.attributes.get("name", ""),
+            "label": element.attributes.get("aria-label", ""),
+        }
+
+        if action_name in ("input_text", "select_dropdown_option"):
+            action = "fill" if action_name == "input_text" else "select"
+            group = False
+            candidates = [f for f in pending if str(f[1]) == params.get("text")]
+        elif action_name == "click_element" and element.attributes.get("type") in (
+            "checkbox",
+            "radio",
+        ):
+            action = "check"
+            group = element.attributes.get("type") == "radio" or bool(
+                element.attributes.get("value")
+            )
+            candidates = [f for f in pending if match_score(f[0], page_field)]
+            if not candidates and len(fields) == 1:
+                candidates = list(fields)
+        else:
+            continue
+        if not candidates:
+            continue
+
+        # Several leaves may share a value (e.g. both cities are "Boston"), prefer
+        # the one matching the element and otherwise the first one in form order
+        path, value = max(candidates, key=lambda f: match_score(f[0], page_field))
+        if action != "check":
+            pending.remove((path, value))
+        steps[path] = ReplayStep(
+            path=list(path),
+            action=action,
+            css_selector=element.css_selector,
+            xpath=element.xpath,
+            value=value,
+            group=group,
+        )
+    return list(steps.values())
+
+
+async def _locate(page: Page, step: ReplayStep):
+    """
+    Find the element a step was recorded against, or None if no selector matches
+    exactly one element anymore.
+    """
+    selectors = [step.css_selector, f"xpath=//{step.xpath}" if step.xpath else None]
+    for selector in selectors:
+        if not selector:
+            continue
+        locator = page.locator(selector)
+        if await locator.count() == 1:
+            return locator
+    return None
+
+
+async def _replay_step(page: Page, step: ReplayStep, value) -> bool:
+    locator = await _locate(page, step)
+    if locator is None:
+        return False
+
+    if step.action == "check":
+        if step.group:
+            # The recorded element is only the right option if the value is
+            # unchanged, even for "yes"/"no" options
+            if str(value) != str(step.value):
+                return False
+            checked = True
+        else:
+            checked = as_checked(value)
+            if checked is None:
+                return False
+        await locator.set_checked(checked, timeout=REPLAY_ACTION_TIMEOUT_MS)
+    elif step.action == "select":
+        options = await locator.evaluate(_READ_OPTIONS_JS)
+        option_value = select_option_value(value, options)
+        if option_value is None:
+            return False
+        await locator.select_option(
+            value=option_value, timeout=REPLAY_ACTION_TIMEOUT_MS
+        )
+    else:
+        await locator.fill(str(value), timeout=REPLAY_ACTION_TIMEOUT_MS)
+    return True
+
+
+async def replay_script(
+    page: Page,
+    script: dict[tuple, ReplayStep],
+    fields: list[tuple[tuple[str, ...], object]],
+) -> list[tuple[tuple[str, ...], object]]:
+    """
+    Replay recorded steps with the values of the current record, without any LLM
+    calls. Blank and False leaves without a step are left at the page default.
+    Returns the leaves that still need an agent, in their original order.
+    """
+    remaining = []
+    for path, value in fields:
+        step = script.get(path)
+        if step is None:
+            if value not in ("", None) and value is not False:
+                remaining.append((path, value))
+            continue
+        try:
+            if not await _replay_step(page, step, value):
+                remaining.append((path, value))
+        except PlaywrightError as e:
+            print(f"Replay failed for {'.'.join(path)}: {e}")
+            remaining.append((path, value))
+    return remaining
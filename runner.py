@@ -0,0 +1,302 @@
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import queue
+import time
+from pathlib import Path
+
+from pydantic import BaseModel
+
+FORM_URL = "https://mendrika-alma.github.io/form-submission/"
+
+
+class RecordResult(BaseModel):
+    record_id: str
+    success: bool
+    duration_seconds: float
+    worker: int
+    llm_calls: int = 0
+    llm_seconds: float = 0.0
+    input_tokens: int = 0
+    output_tokens: int = 0
+    error: str | None = None
+
+
+def iter_shard(records_path: str, shard: int, shards: int, id_key: str, skip: set):
+    """
+    Stream the (record id, form data, error) triples of one shard, every shards-th
+    line starting at shard. The id is popped from the record, the line number if
+    absent. A line that is not a JSON object has no form data but an error, keyed
+    by its line number, so it fails on its own instead of ending the shard.
+    """
+    with open(records_path) as records_file:
+        for line_number, line in enumerate(records_file):
+            if line_number % shards != shard or not line.strip():
+                continue
+            try:
+                form_data = json.loads(line)
+            except json.JSONDecodeError as e:
+                form_data, error = None, f"Invalid JSON: {e}"
+            else:
+                error = None
+                if not isinstance(form_data, dict):
+                    form_data = None
+                    error = f"Not a JSON object: {line.strip()[:80]}"
+            if form_data is None:
+                record_id = str(line_number)
+            else:
+                record_id = str(form_data.pop(id_key, line_number))
+            if record_id not in skip:
+                yield record_id, form_data, error
+
+
+async def run_shard(args, shard: int, skip: set, results):
+    # Imported here, the parent process never needs a browser
+    from browser_use import Browser, BrowserConfig
+
+    from artifacts import ArtifactMode, ArtifactWriter
+    from hedging import HedgingPolicy
+    from main import ModelType, PromptType, fill_form
+    from model_pool import ModelPool
+    from network import DEFAULT_BLOCKED_RESOURCES
+    from tracing import Tracer
+
+    browser = Browser(config=BrowserConfig(headless=not args.headed))
+    artifacts = ArtifactWriter(ArtifactMode(args.artifact_mode))
+    semaphore = asyncio.Semaphore(args.concurrency)
+    # The provider's limits are split evenly between the workers
+    model_pool = ModelPool(
+        args.rpm / args.workers if args.rpm else None,
+        args.tpm / args.workers if args.tpm else None,
+    )
+    hedging = None
+    if args.hedge:
+        hedging = HedgingPolicy(args.hedge, alternate=args.hedge_alternate)
+    artifact_dir = Path(args.artifacts)
+    artifact_dir.mkdir(parents=True, exist_ok=True)
+
+    async def fill_record(record_id: str, form_data: dict):
+        try:
+            tracer = Tracer()
+            start = time.perf_counter()
+            error = None
+            try:
+                success = await fill_form(
+                    args.base_url,
+                    form_data,
+                    args.timeout,
+                    model_type=ModelType(args.model_type),
+                    prompt_type=PromptType(args.prompt_type),
+                    browser=browser,
+                    artifact_prefix=str(artifact_dir / record_id),
+                    artifacts=artifacts,
+                    tracer=tracer,
+                    budget=args.budget,
+                    block_resources=(
+                        DEFAULT_BLOCKED_RESOURCES
+                        if args.block_resources
+                        else frozenset()
+                    ),
+                    snapshot_dir=args.snapshot_dir,
+                    bounded_memory=args.bounded_memory,
+                    model_pool=model_pool,
+                    hedging=hedging,
+                )
+            except Exception as e:
+                success = False
+                error = f"{type(e).__name__}: {e}"
+                print(f"Record {record_id} failed: {error}")
+            run_span = next(span for span in tracer.spans if span.kind == "run")
+            results.put(
+                RecordResult(
+                    record_id=record_id,
+                    success=success,
+                    duration_seconds=time.perf_counter() - start,
+                    worker=shard,
+                    llm_calls=run_span.llm_calls,
+                    llm_seconds=run_span.llm_seconds,
+                    input_tokens=run_span.input_tokens,
+                    output_tokens=run_span.output_tokens,
+                    error=error,
+                ).model_dump_json()
+            )
+        finally:
+            semaphore.release()
+
+    tasks = set()
+    try:
+        for record_id, form_data, error in iter_shard(
+            args.records, shard, args.workers, args.id_key, skip
+        ):
+            if error is not None:
+                print(f"Record {record_id} failed: {error}")
+                results.put(
+                    RecordResult(
+                        record_id=record_id,
+                        success=False,
+                        duration_seconds=0.0,
+                        worker=shard,
+                        error=error,
+                    ).model_dump_json()
+                )
+                continue
+            # Read the next record only once a slot is free
+            await semaphore.acquire()
+            task = asyncio.create_task(fill_record(record_id, form_data))
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+        await asyncio.gather(*tasks)
+    finally:
+        await browser.close()
+        await artifacts.close()
+        for model, stats in model_pool.stats().items():
+            print(
+                f"Worker {shard} {model}: {stats['requests']} requests, "
+                f"{stats['queue_seconds']:.1f}s queued, "
+                f"{stats['max_queue_seconds']:.1f}s longest wait"
+            )
+        if hedging is not None:
+            print(
+                f"Worker {shard}: hedged {hedging.hedged}/{hedging.calls} LLM calls, "
+                f"{hedging.hedge_wins} duplicates won"
+            )
+
+
+def _worker(args, shard: int, skip: set, results):
+    try:
+        asyncio.run(run_shard(args, shard, skip, results))
+    finally:
+        results.put(None)  # this shard is done
+
+
+def load_done_ids(output_path: str, retry_failed: bool) -> set:
+    """
+    Record ids that already have a result in the output file, to be skipped.
+    """
+    done = set()
+    if not os.path.exists(output_path):
+        return done
+    with open(output_path) as output_file:
+        for line in output_file:
+            if not line.strip():
+                continue
+            result = RecordResult.model_validate_json(line)
+            if result.success or not retry_failed:
+                done.add(result.record_id)
+    return done
+
+
+def main():
+    # Only for the choices, the workers import what they run themselves
+    from artifacts import ArtifactMode
+    from main import ModelType, PromptType
+
+    parser = argparse.ArgumentParser(
+        prog="python runner.py",
+        description="Fill one form per line of a JSONL file across worker processes.",
+    )
+    parser.add_argument("records", help="JSONL file, one form_data object per line")
+    parser.add_argument("output", help="JSONL file results are appended to")
+    parser.add_argument("--base-url", default=FORM_URL)
+    parser.add_argument("--id-key", default="id", help="key holding the record id")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument(
+        "--concurrency", type=int, default=4, help="records in flight per worker"
+    )
+    parser.add_argument(
+        "--prompt-type",
+        choices=[prompt_type.value for prompt_type in PromptType],
+        default=PromptType.DIRECT.value,
+    )
+    parser.add_argument(
+        "--model-type",
+        choices=[model_type.value for model_type in ModelType],
+        default=ModelType.CHATGPT.value,
+    )
+    parser.add_argument("--timeout", type=float, default=600)
+    parser.add_argument("--budget", type=float, help="seconds for a whole record")
+    parser.add_argument("--headed", action="store_true")
+    parser.add_argument("--artifacts", default="artifacts")
+    parser.add_argument(
+        "--artifact-mode",
+        choices=[mode.value for mode in ArtifactMode],
+        default=ArtifactMode.OFF.value,
+    )
+    parser.add_argument(
+        "--rpm", type=float, help="LLM requests per minute, all workers"
+    )
+    parser.add_argument("--tpm", type=float, help="LLM tokens per minute, all workers")
+    parser.add_argument(
+        "--hedge",
+        type=float,
+        metavar="PERCENTILE",
+        help="resend LLM calls slower than this latency percentile, e.g. 0.9",
+    )
+    parser.add_argument(
+        "--hedge-alternate",
+        action="store_true",
+        help="resend them to the other model type",
+    )
+    parser.add_argument(
+        "--block-resources",
+        action="store_true",
+        help="do not load images, media and fonts",
+    )
+    parser.add_argument(
+        "--snapshot-dir", help="record the form page here once, serve it from disk"
+    )
+    parser.add_argument(
+        "--bounded-memory",
+        action="store_true",
+        help="keep agent histories compact, for long-lived workers",
+    )
+    parser.add_argument(
+        "--retry-failed",
+        action="store_true",
+        help="also rerun records whose earlier result failed",
+    )
+    args = parser.parse_args()
+
+    skip = load_done_ids(args.output, args.retry_failed)
+    if skip:
+        print(f"Skipping {len(skip)} records with results in {args.output}")
+
+    # Spawned, a forked child would inherit the parent's state and threads
+    context = multiprocessing.get_context("spawn")
+    results = context.Queue()
+    workers = [
+        context.Process(target=_worker, args=(args, shard, skip, results))
+        for shard in range(args.workers)
+    ]
+    for worker in workers:
+        worker.start()
+
+    succeeded = failed = 0
+    running = len(workers)
+    with open(args.output, "a") as output_file:
+        # Only this process writes, results of all workers arrive on the queue
+        while running:
+            try:
+                line = results.get(timeout=5)
+            except queue.Empty:
+                if not any(worker.is_alive() for worker in workers):
+                    break  # a worker died without saying so
+                continue
+            if line is None:
+                running -= 1
+                continue
+            output_file.write(line + "\n")
+            output_file.flush()
+            if json.loads(line)["success"]:
+                succeeded += 1
+            else:
+                failed += 1
+    for worker in workers:
+        worker.join()
+    print(f"{succeeded} succeeded, {failed} failed")
+
+
+if __name__ == "__main__":
+    main()
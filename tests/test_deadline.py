@@ -0,0 +1,79 @@
+import asyncio
+
+import pytest
+
+from deadline import DeadlineScheduler
+
+
+def test_without_budget_every_stage_gets_the_step_timeout():
+    scheduler = DeadlineScheduler(None, step_timeout=30)
+    scheduler.plan(10)
+    assert scheduler.timeout_for(1) == 30
+    assert scheduler.timeout_for(10) == 30
+    assert scheduler.retries == 0
+
+
+def test_budget_is_shared_by_the_work_left():
+    scheduler = DeadlineScheduler(100, step_timeout=1000)
+    scheduler.plan(10)
+    assert scheduler.timeout_for(2) == pytest.approx(20, abs=0.5)
+    assert scheduler.timeout_for(10) == pytest.approx(100, abs=0.5)
+
+
+def test_step_timeout_caps_a_share():
+    scheduler = DeadlineScheduler(100, step_timeout=15)
+    scheduler.plan(2)
+    assert scheduler.timeout_for(1) == 15
+
+
+def test_finished_work_is_no_longer_planned():
+    scheduler = DeadlineScheduler(100, step_timeout=1000)
+    scheduler.plan(4)
+
+    async def stage():
+        return "done"
+
+    assert asyncio.run(scheduler.run(stage, work=1)) == "done"
+    assert scheduler.work_left == 3
+
+
+def test_timed_out_stage_is_retried():
+    scheduler = DeadlineScheduler(10, step_timeout=0.2, backoff=0.01)
+    scheduler.plan(1)
+    attempts = []
+
+    async def stage():
+        attempts.append(len(attempts))
+        if len(attempts) == 1:
+            await asyncio.sleep(1)
+        return "done"
+
+    assert asyncio.run(scheduler.run(stage)) == "done"
+    assert attempts == [0, 1]
+
+
+def test_timeout_raised_once_retries_are_used_up():
+    scheduler = DeadlineScheduler(10, step_timeout=0.05, retries=1, backoff=0.01)
+    scheduler.plan(1)
+    attempts = []
+
+    async def stage():
+        attempts.append(len(attempts))
+        await asyncio.sleep(1)
+
+    with pytest.raises(TimeoutError):
+        asyncio.run(scheduler.run(stage))
+    assert len(attempts) == 2
+
+
+def test_passed_deadline_raises_without_running():
+    scheduler = DeadlineScheduler(0, step_timeout=10)
+    scheduler.plan(1)
+    calls = []
+
+    async def stage():
+        calls.append(1)
+
+    with pytest.raises(TimeoutError):
+        asyncio.run(scheduler.run(stage))
+    assert calls == []
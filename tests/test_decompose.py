@@ -0,0 +1,73 @@
+from decompose import get_form_fields, prune_fields
+
+
+def test_empty_leaves_are_left_blank():
+    fields = get_form_fields(
+        {"client": {"family_name": "Jones", "middle_name": "", "fax": None}}
+    )
+    to_fill, to_leave_blank = prune_fields(fields)
+    assert to_fill == [(("client", "family_name"), "Jones")]
+    assert to_leave_blank == [
+        (("client", "middle_name"), ""),
+        (("client", "fax"), None),
+    ]
+
+
+def test_unchecked_boxes_are_left_blank():
+    fields = get_form_fields({"attorney": {"civil_case": False, "eligible": True}})
+    to_fill, to_leave_blank = prune_fields(fields)
+    assert to_fill == [(("attorney", "eligible"), True)]
+    assert to_leave_blank == [(("attorney", "civil_case"), False)]
+
+
+def test_dependents_of_an_unset_controller_are_dropped():
+    fields = get_form_fields(
+        {
+            "attorney": {
+                "civil_case": False,
+                "civil_matter": "Appeal",
+                "associated_with_student": "no",
+                "law_student": "",
+            }
+        }
+    )
+    to_fill, to_leave_blank = prune_fields(fields)
+    # A "no" answer is still one to enter, it only switches its dependents off
+    assert to_fill == [(("attorney", "associated_with_student"), "no")]
+    assert to_leave_blank == [(("attorney", "civil_case"), False)]
+
+
+def test_dependents_of_a_set_controller_are_kept():
+    fields = get_form_fields(
+        {"attorney": {"civil_case": True, "civil_matter": "Appeal", "org_name": ""}}
+    )
+    to_fill, to_leave_blank = prune_fields(fields)
+    assert to_fill == [
+        (("attorney", "civil_case"), True),
+        (("attorney", "civil_matter"), "Appeal"),
+    ]
+    # Without is_nonprofit_rep in the record nothing controls it
+    assert to_leave_blank == [(("attorney", "org_name"), "")]
+
+
+def test_unit_number_without_unit_type_is_kept():
+    fields = get_form_fields({"client": {"unit_type": "", "address_line_2": "12B"}})
+    to_fill, to_leave_blank = prune_fields(fields)
+    assert to_fill == [(("client", "address_line_2"), "12B")]
+    assert to_leave_blank == [(("client", "unit_type"), "")]
+
+
+def test_dependencies_are_looked_up_among_siblings():
+    fields = get_form_fields(
+        {
+            "entries": [
+                {"flag": True, "detail": "kept"},
+                {"flag": False, "detail": "dropped"},
+            ]
+        }
+    )
+    to_fill, _ = prune_fields(fields, {"detail": "flag"})
+    assert to_fill == [
+        (("entries", "Item 0", "flag"), True),
+        (("entries", "Item 0", "detail"), "kept"),
+    ]
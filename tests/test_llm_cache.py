@@ -0,0 +1,86 @@
+import os
+
+from langchain_core.messages import AIMessage
+from langchain_core.outputs import ChatGeneration
+
+from llm_cache import DiskLLMCache
+
+LLM_STRING = "stub-model temperature=0"
+
+
+def _generations(text: str, tokens: int = 0):
+    usage = None
+    if tokens:
+        usage = {"input_tokens": tokens, "output_tokens": 0, "total_tokens": tokens}
+    return [ChatGeneration(message=AIMessage(content=text, usage_metadata=usage))]
+
+
+def _entry_size(tmp_path) -> int:
+    # The size of one cached response, the same for every prompt below
+    cache = DiskLLMCache(str(tmp_path / "probe"))
+    cache.update("probe", LLM_STRING, _generations("x" * 1000))
+    return cache._size
+
+
+def _age(cache: DiskLLMCache, prompt: str, seconds_ago: float):
+    path = cache._path(prompt, LLM_STRING)
+    mtime = path.stat().st_mtime - seconds_ago
+    os.utime(path, (mtime, mtime))
+
+
+def test_hit_and_miss(tmp_path):
+    cache = DiskLLMCache(str(tmp_path))
+    cache.update("prompt", LLM_STRING, _generations("answer"))
+    assert cache.lookup("prompt", LLM_STRING)[0].message.content == "answer"
+    assert cache.lookup("prompt", "other-model") is None
+    assert cache.lookup("other prompt", LLM_STRING) is None
+
+
+def test_hit_reports_no_tokens(tmp_path):
+    cache = DiskLLMCache(str(tmp_path))
+    cache.update("prompt", LLM_STRING, _generations("answer", tokens=50))
+    assert cache.lookup("prompt", LLM_STRING)[0].message.usage_metadata is None
+
+
+def test_timestamps_do_not_change_the_key(tmp_path):
+    cache = DiskLLMCache(str(tmp_path))
+    cache.update(
+        "Current date and time: 2024-01-01 10:00", LLM_STRING, _generations("answer")
+    )
+    hit = cache.lookup("Current date and time: 2025-06-30 23:59", LLM_STRING)
+    assert hit[0].message.content == "answer"
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path):
+    size = _entry_size(tmp_path)
+    cache = DiskLLMCache(str(tmp_path / "cache"), max_bytes=int(size * 3.5))
+    for n, prompt in enumerate(("a", "b", "c")):
+        cache.update(prompt, LLM_STRING, _generations("x" * 1000))
+        _age(cache, prompt, 100 - n)
+    # a is the oldest write but was just read
+    assert cache.lookup("a", LLM_STRING) is not None
+
+    cache.update("d", LLM_STRING, _generations("x" * 1000))
+    # Over the limit, evicted down to 90% of it: b goes, a, c and d stay
+    assert cache.lookup("b", LLM_STRING) is None
+    for prompt in ("a", "c", "d"):
+        assert cache.lookup(prompt, LLM_STRING) is not None
+    assert cache._size == 3 * size
+
+
+def test_size_survives_a_restart(tmp_path):
+    size = _entry_size(tmp_path)
+    cache = DiskLLMCache(str(tmp_path / "cache"))
+    cache.update("a", LLM_STRING, _generations("x" * 1000))
+    cache.update("b", LLM_STRING, _generations("x" * 1000))
+    # Rewriting an entry replaces its size instead of adding to it
+    cache.update("b", LLM_STRING, _generations("x" * 1000))
+    assert DiskLLMCache(str(tmp_path / "cache"))._size == 2 * size
+
+
+def test_clear(tmp_path):
+    cache = DiskLLMCache(str(tmp_path))
+    cache.update("prompt", LLM_STRING, _generations("answer"))
+    cache.clear()
+    assert cache.lookup("prompt", LLM_STRING) is None
+    assert cache._size == 0
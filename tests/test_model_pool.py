@@ -0,0 +1,175 @@
+import asyncio
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+from langchain_openai import ChatOpenAI
+
+from model_pool import ModelPool, TokenBucketRateLimiter
+from tracing import Tracer
+
+
+class StubOpenAIServer:
+    """
+    An OpenAI-compatible chat completions endpoint on localhost that answers every
+    request with the same text and reports total_tokens of usage.
+    """
+
+    def __init__(self, total_tokens: int):
+        self.total_tokens = total_tokens
+        self.request_times: list[float] = []
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                server.request_times.append(time.monotonic())
+                body = json.dumps(
+                    {
+                        "id": "chatcmpl-stub",
+                        "object": "chat.completion",
+                        "created": 0,
+                        "model": "stub-model",
+                        "choices": [
+                            {
+                                "index": 0,
+                                "message": {"role": "assistant", "content": "ok"},
+                                "finish_reason": "stop",
+                            }
+                        ],
+                        "usage": {
+                            "prompt_tokens": server.total_tokens - 1,
+                            "completion_tokens": 1,
+                            "total_tokens": server.total_tokens,
+                        },
+                    }
+                ).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self._server.server_address[1]}/v1"
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._server.shutdown()
+        self._server.server_close()
+
+
+def _pooled_model(pool: ModelPool, server: StubOpenAIServer):
+    return pool.get(
+        ChatOpenAI,
+        "stub-model",
+        api_key="stub",
+        base_url=server.base_url,
+        max_retries=0,
+    )
+
+
+def test_reported_tokens_delay_the_next_request():
+    # 6100 tokens against a 6000 per minute budget put it 100 tokens in debt,
+    # a second at 100 tokens a second
+    pool = ModelPool(tokens_per_minute=6000)
+
+    async def two_calls():
+        model = _pooled_model(pool, server)
+        await model.ainvoke("first")
+        await model.ainvoke("second")
+
+    with StubOpenAIServer(total_tokens=6100) as server:
+        asyncio.run(two_calls())
+
+    first, second = server.request_times
+    assert second - first == pytest.approx(1.0, abs=0.5)
+    stats = pool.stats()["stub-model"]
+    assert stats["requests"] == 2
+    assert stats["max_queue_seconds"] == pytest.approx(1.0, abs=0.5)
+
+
+def test_requests_within_budget_are_not_delayed():
+    pool = ModelPool(requests_per_minute=600, tokens_per_minute=60000)
+
+    async def calls():
+        model = _pooled_model(pool, server)
+        await asyncio.gather(*(model.ainvoke(f"call {n}") for n in range(5)))
+
+    with StubOpenAIServer(total_tokens=10) as server:
+        asyncio.run(calls())
+
+    assert len(server.request_times) == 5
+    assert pool.stats()["stub-model"]["queue_seconds"] < 0.1
+
+
+def test_pool_shares_models_and_limiters_by_name():
+    pool = ModelPool(requests_per_minute=60)
+
+    async def get_models():
+        first = pool.get(ChatOpenAI, "model-a", api_key="stub")
+        again = pool.get(ChatOpenAI, "model-a", api_key="stub")
+        warmer = pool.get(ChatOpenAI, "model-a", api_key="stub", temperature=0.5)
+        other = pool.get(ChatOpenAI, "model-b", api_key="stub")
+        return first, again, warmer, other
+
+    first, again, warmer, other = asyncio.run(get_models())
+    assert first is again
+    assert warmer is not first
+    assert warmer.rate_limiter is first.rate_limiter
+    assert other.rate_limiter is not first.rate_limiter
+    assert set(pool.limiters) == {"model-a", "model-b"}
+
+
+def test_unlimited_pool_attaches_no_limiter():
+    async def get_model():
+        return ModelPool().get(ChatOpenAI, "model-a", api_key="stub")
+
+    assert asyncio.run(get_model()).rate_limiter is None
+
+
+def test_waiting_runs_are_granted_round_robin():
+    # One request every 0.1 seconds once the bucket is empty
+    limiter = TokenBucketRateLimiter(requests_per_minute=600)
+    while limiter.acquire(blocking=False):
+        pass
+    tracer = Tracer()
+    granted = []
+
+    async def call(name):
+        await limiter.aacquire()
+        granted.append(name)
+
+    async def run(name, calls):
+        with tracer.span("run", name):
+            return [asyncio.create_task(call(f"{name}{n}")) for n in range(calls)]
+
+    async def runs():
+        tasks = await run("a", 3) + await run("b", 1)
+        await asyncio.gather(*tasks)
+
+    asyncio.run(runs())
+    assert granted == ["a0", "b0", "a1", "a2"]
+
+
+def test_non_blocking_acquire_fails_on_an_empty_bucket():
+    limiter = TokenBucketRateLimiter(requests_per_minute=2)
+    assert limiter.acquire(blocking=False)
+    assert limiter.acquire(blocking=False)
+    assert not limiter.acquire(blocking=False)
+    assert limiter.granted == 2
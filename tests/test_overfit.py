@@ -0,0 +1,83 @@
+import copy
+
+from data import MOCK_DATA
+from overfit import generate_overfitted_form_instructions
+
+
+def _render(**changes) -> str:
+    data = copy.deepcopy(MOCK_DATA)
+    for path, value in changes.items():
+        *parents, key = path.split("__")
+        node = data
+        for parent in parents:
+            node = node[parent]
+        node[key] = value
+    return generate_overfitted_form_instructions(data)
+
+
+def test_values_are_entered_under_their_items():
+    instructions = generate_overfitted_form_instructions(MOCK_DATA)
+    assert instructions.startswith("\nPlease fill out the Form A-28")
+    assert "2.a. Family Name (Last Name): Enter `Doe`.\n" in instructions
+    assert "6.a. Family Name (Last Name): Enter `Jones`.\n" in instructions
+    assert "3.d. State: Select `Massachusetts` from the dropdown.\n" in instructions
+
+
+def test_empty_values_are_shown_as_leave_blank():
+    instructions = _render(attorney__unit_type="", attorney__address_line_2="")
+    assert (
+        "3.b. Unit Type: Select the appropriate checkbox (`Apt.`, `Ste.`, or `Flr.`) "
+        "based on value `[Leave Blank]`.\n" in instructions
+    )
+    assert "the unit number `[Leave Blank]`" in instructions
+
+
+def test_nonprofit_lines_follow_their_checkbox():
+    unset = generate_overfitted_form_instructions(MOCK_DATA)
+    assert "do NOT check the box related to nonprofit" in unset
+    assert "2.b. Name of Recognized Organization: Leave blank" in unset
+
+    instructions = _render(
+        attorney__is_nonprofit_rep=True,
+        attorney__org_name="Legal Aid Society",
+        attorney__accreditation_date="",
+    )
+    assert "For item 2.a, check the box related to nonprofit" in instructions
+    assert (
+        "2.b. Name of Recognized Organization: Enter `Legal Aid Society`.\n"
+        in instructions
+    )
+    assert "2.c. Date of Accreditation: Enter `[Leave Blank]`.\n" in instructions
+
+
+def test_law_student_line_follows_association():
+    instructions = _render(
+        attorney__associated_with_student="yes", attorney__law_student="Sam Lee"
+    )
+    assert 'For item 3, check the box that says "I am associated' in instructions
+    assert "4.b. Name of Law Student or Law Graduate: Enter `Sam Lee`." in instructions
+
+
+def test_part6_entries_are_numbered_in_order():
+    entries = copy.deepcopy(MOCK_DATA["part6"]["additional_info"]["entries"])
+    entries.append(
+        {
+            "page_number": "3",
+            "part_number": "4",
+            "item_number": "1.b",
+            "additional_info": "Second entry",
+        }
+    )
+    instructions = _render(part6__additional_info__entries=entries)
+    assert "2.a. Page Number: Enter `1`.\n" in instructions
+    assert "3.a. Page Number: Enter `3`.\n" in instructions
+    assert instructions.index("2.c. Item Number: Enter `1.a`.") < instructions.index(
+        "3.c. Item Number: Enter `1.b`."
+    )
+    assert 'enter: "Second entry"' in instructions
+
+
+def test_rendering_does_not_change_the_record():
+    data = copy.deepcopy(MOCK_DATA)
+    generate_overfitted_form_instructions(data)
+    assert data == MOCK_DATA
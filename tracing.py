@@ -0,0 +1,245 @@
+import contextvars
+import time
+import uuid
+from collections.abc import Callable
+from contextlib import contextmanager
+from pathlib import Path
+
+from browser_use import Agent
+from browser_use.browser.context import BrowserContext
+from langchain_core.callbacks import AsyncCallbackHandler
+from pydantic import BaseModel, Field, PrivateAttr
+
+_current_span: contextvars.ContextVar["Span | None"] = contextvars.ContextVar(
+    "current_span", default=None
+)
+
+
+class Span(BaseModel):
+    kind: str  # "run", "stage" or "step"
+    name: str
+    run_id: str
+    span_id: str = Field(default_factory=lambda: uuid.uuid4().hex[:16])
+    parent_id: str | None = None
+    start_time: float = Field(default_factory=time.time)
+    end_time: float | None = None
+    duration_seconds: float = 0.0
+    llm_seconds: float = 0.0
+    queue_seconds: float = 0.0  # waiting for a rate limit, part of llm_seconds
+    browser_seconds: float = 0.0  # everything that is not LLM, screenshot or artifact
+    screenshot_seconds: float = 0.0
+    artifact_seconds: float = 0.0
+    llm_calls: int = 0
+    input_tokens: int = 0
+    output_tokens: int = 0
+    actions: int = 0
+    success: bool | None = None
+    attributes: dict = Field(default_factory=dict)
+    _perf_start: float = PrivateAttr(default_factory=time.perf_counter)
+
+
+# Measured quantities that add up from steps into their stage and run
+_ROLLUP_FIELDS = (
+    "llm_seconds",
+    "queue_seconds",
+    "screenshot_seconds",
+    "artifact_seconds",
+    "llm_calls",
+    "input_tokens",
+    "output_tokens",
+    "actions",
+)
+
+
+def _add_to_current_span(**amounts):
+    span = _current_span.get()
+    if span is None:
+        return
+    for key, amount in amounts.items():
+        setattr(span, key, getattr(span, key) + amount)
+
+
+def current_run_id() -> str | None:
+    span = _current_span.get()
+    return span.run_id if span else None
+
+
+def record_queue_wait(seconds: float):
+    """
+    Attribute time an LLM call waited for its turn at a rate limit to the innermost
+    open span of the current task.
+    """
+    _add_to_current_span(queue_seconds=seconds)
+
+
+class LLMTimingCallback(AsyncCallbackHandler):
+    """
+    Attributes time spent waiting on the model, and the tokens it reports, to the
+    innermost open span of the current task. Stateless apart from in-flight start
+    times, so one instance can be shared by every model and run.
+    """
+
+    run_inline = True
+
+    def __init__(self):
+        self._started: dict = {}
+
+    async def on_chat_model_start(self, serialized, messages, *, run_id, **kwargs):
+        self._started[run_id] = time.perf_counter()
+
+    async def on_llm_end(self, response, *, run_id, **kwargs):
+        started = self._started.pop(run_id, None)
+        input_tokens = output_tokens = 0
+        for generations in response.generations:
+            for generation in generations:
+                usage = getattr(
+                    getattr(generation, "message", None), "usage_metadata", None
+                )
+                if usage:
+                    input_tokens += usage.get("input_tokens", 0)
+                    output_tokens += usage.get("output_tokens", 0)
+        _add_to_current_span(
+            llm_seconds=time.perf_counter() - started if started else 0.0,
+            llm_calls=1,
+            input_tokens=input_tokens,
+            output_tokens=output_tokens,
+        )
+
+    async def on_llm_error(self, error, *, run_id, **kwargs):
+        started = self._started.pop(run_id, None)
+        if started:
+            _add_to_current_span(llm_seconds=time.perf_counter() - started)
+
+
+LLM_TIMING_CALLBACK = LLMTimingCallback()
+
+
+class Tracer:
+    """
+    Records nested run/stage/step spans. Finished spans are kept for the summary
+    table and, with a trace_path, appended to a JSONL trace file as they finish.
+    Listeners are called with every span and whether it finished, as it starts and
+    as it finishes.
+    """
+
+    def __init__(self, trace_path: str | None = None):
+        self.trace_path = Path(trace_path) if trace_path else None
+        self.spans: list[Span] = []
+        self.listeners: list[Callable[[Span, bool], None]] = []
+
+    def start_span(self, kind: str, name: str, **attributes) -> tuple[Span, object]:
+        parent = _current_span.get()
+        span = Span(
+            kind=kind,
+            name=name,
+            run_id=parent.run_id if parent else uuid.uuid4().hex[:16],
+            parent_id=parent.span_id if parent else None,
+            attributes=attributes,
+        )
+        for listener in self.listeners:
+            listener(span, False)
+        return span, _current_span.set(span)
+
+    def end_span(self, span: Span, token):
+        _current_span.reset(token)
+        span.end_time = time.time()
+        span.duration_seconds = time.perf_counter() - span._perf_start
+        span.browser_seconds = max(
+            0.0,
+            span.duration_seconds
+            - span.llm_seconds
+            - span.screenshot_seconds
+            - span.artifact_seconds,
+        )
+        parent = _current_span.get()
+        if parent is not None:
+            for key in _ROLLUP_FIELDS:
+                setattr(parent, key, getattr(parent, key) + getattr(span, key))
+
+        self.spans.append(span)
+        if self.trace_path:
+            self.trace_path.parent.mkdir(parents=True, exist_ok=True)
+            with self.trace_path.open("a") as trace_file:
+                trace_file.write(span.model_dump_json() + "\n")
+        for listener in self.listeners:
+            listener(span, True)
+
+    @contextmanager
+    def span(self, kind: str, name: str, **attributes):
+        span, token = self.start_span(kind, name, **attributes)
+        try:
+            yield span
+        finally:
+            self.end_span(span, token)
+
+    def add(self, **amounts):
+        """
+        Add measured amounts, e.g. artifact_seconds, to the innermost open span.
+        """
+        _add_to_current_span(**amounts)
+
+    def instrument_context(self, context: BrowserContext) -> BrowserContext:
+        """
+        Time screenshot capture of a browser context into the current span.
+        """
+        take_screenshot = context.take_screenshot
+
+        async def timed_take_screenshot(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return await take_screenshot(*args, **kwargs)
+            finally:
+                _add_to_current_span(screenshot_seconds=time.perf_counter() - start)
+
+        context.take_screenshot = timed_take_screenshot
+        return context
+
+    def instrument_agent(self, agent: Agent) -> Agent:
+        """
+        Open a step span around every agent step.
+        """
+        step = agent.step
+
+        async def traced_step(step_info=None):
+            history = agent.state.history.history
+            steps_before = len(history)
+            with self.span("step", f"step {agent.state.n_steps}") as span:
+                await step(step_info)
+                if len(history) > steps_before:
+                    item = history[-1]
+                    if item.model_output:
+                        span.actions = len(item.model_output.action)
+                    span.success = not any(result.error for result in item.result)
+
+        agent.step = traced_step
+        return agent
+
+    def format_summary(self, run_id: str | None = None) -> str:
+        """
+        A plain text table of the stages of a run (the latest one by default) with
+        the run totals as the last row.
+        """
+        runs = [span for span in self.spans if span.kind == "run"]
+        if run_id is None and runs:
+            run_id = runs[-1].run_id
+        rows = [
+            span
+            for span in self.spans
+            if span.run_id == run_id and span.kind in ("stage", "run")
+        ]
+        header = (
+            f"{'span':<40} {'wall':>8} {'llm':>8} {'queue':>7} {'browser':>8} {'shots':>7} "
+            f"{'artif':>7} {'calls':>5} {'tok in':>8} {'tok out':>7} {'acts':>5} ok"
+        )
+        lines = [header, "-" * len(header)]
+        for span in rows:
+            ok = "-" if span.success is None else ("y" if span.success else "n")
+            lines.append(
+                f"{span.name[:40]:<40} {span.duration_seconds:>8.2f} "
+                f"{span.llm_seconds:>8.2f} {span.queue_seconds:>7.2f} "
+                f"{span.browser_seconds:>8.2f} "
+                f"{span.screenshot_seconds:>7.2f} {span.artifact_seconds:>7.2f} "
+                f"{span.llm_calls:>5} {span.input_tokens:>8} {span.output_tokens:>7} "
+                f"{span.actions:>5} {ok}"
+            )
+        return "\n".join(lines)
@@ -0,0 +1,78 @@
+import asyncio
+import base64
+import io
+
+from browser_use.browser.context import BrowserContext
+from PIL import Image
+
+# A cheap fingerprint of what a screenshot would show: the URL, the scroll
+# position, the size of the document and the state of every control
+_DOM_HASH_JS = """() => {
+    let text = location.href + "|" + window.scrollX + "," + window.scrollY + "|" +
+        document.body.innerHTML.length;
+    for (const el of document.querySelectorAll("input, select, textarea")) {
+        text += "|" + el.value + (el.checked ? "*" : "");
+    }
+    let hash = 0;
+    for (let i = 0; i < text.length; i++) {
+        hash = (Math.imul(31, hash) + text.charCodeAt(i)) | 0;
+    }
+    return hash;
+}"""
+
+
+def downscale_screenshot(screenshot: str, scale: float) -> str:
+    """
+    A base64 PNG screenshot resized by scale, fewer image tokens per step.
+    """
+    image = Image.open(io.BytesIO(base64.b64decode(screenshot)))
+    image = image.resize(
+        (max(1, round(image.width * scale)), max(1, round(image.height * scale))),
+        Image.LANCZOS,
+    )
+    buffer = io.BytesIO()
+    image.save(buffer, format="PNG")
+    return base64.b64encode(buffer.getvalue()).decode("utf-8")
+
+
+class ScreenshotFilter:
+    """
+    Downscales the screenshots of a browser context and drops the ones taken of a
+    page that has not changed since the previous screenshot, so an agent with
+    vision on only sends an image when there is something new to see. Call reset
+    before each agent so its first step always gets one; the screenshots of an
+    agent without vision are left as they are, it never sends them.
+    """
+
+    def __init__(self, scale: float = 0.5):
+        self.scale = scale
+        self.use_vision = True
+        self._last_hash: int | None = None
+
+    def reset(self, use_vision: bool = True):
+        self.use_vision = use_vision
+        self._last_hash = None
+
+    def instrument_context(self, context: BrowserContext) -> BrowserContext:
+        take_screenshot = context.take_screenshot
+
+        async def filtered_take_screenshot(*args, **kwargs):
+            if not self.use_vision:
+                return await take_screenshot(*args, **kwargs)
+            page = await context.get_current_page()
+            dom_hash = await page.evaluate(_DOM_HASH_JS)
+            if dom_hash == self._last_hash:
+                # The agent already saw this, the step goes text only
+                return None
+            screenshot = await take_screenshot(*args, **kwargs)
+            self._last_hash = dom_hash
+            if self.scale != 1:
+                # A resize and PNG encode per step, off the event loop so the
+                # other fills sharing it are not stalled
+                screenshot = await asyncio.to_thread(
+                    downscale_screenshot, screenshot, self.scale
+                )
+            return screenshot
+
+        context.take_screenshot = filtered_take_screenshot
+        return context